@@ -0,0 +1,286 @@
+import datetime
+import functools
+import os
+import sys
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+from plotly.basedatatypes import BaseFigure
+
+import cube as pandas_backend
+import sql_backend
+from indexes import trailing_mean
+
+CHART_CACHE_MAX_ENTRIES = int(os.environ.get('CHART_CACHE_MAX_ENTRIES', 512))
+CHART_CACHE_MAX_MB = float(os.environ.get('CHART_CACHE_MAX_MB', 64))
+
+
+# --- BOUNDED LRU RESULT CACHE ---
+def _sizeof(value):
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True, index=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(deep=True, index=True))
+    if isinstance(value, BaseFigure):
+        # Cached figures (figures.py): count the trace arrays, not the wrapper
+        return _sizeof(value.to_dict())
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(_sizeof(v) for v in value.values())
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(_sizeof(v) for v in value)
+    return sys.getsizeof(value)
+
+
+class LRUCache:
+    """Thread-safe LRU cache bounded by entry count and approximate bytes."""
+
+    def __init__(self, max_entries=CHART_CACHE_MAX_ENTRIES, max_bytes=int(CHART_CACHE_MAX_MB * 1e6)):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key][0]
+            self.misses += 1
+            return default
+
+    def put(self, key, value):
+        size = _sizeof(value)
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= self._entries.pop(key)[1]
+            self._entries[key] = (value, size)
+            self._bytes += size
+            while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+            }
+
+
+chart_cache = LRUCache()
+
+_MISSING = object()
+
+
+def _freeze(value):
+    # Unit selections arrive as lists; order does not change the result
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return tuple(sorted(value))
+    return value
+
+
+def memoized(fn):
+    """Cache ``fn(cube, *args)`` in ``chart_cache`` keyed on its filter arguments.
+
+    Results are shared between sessions and must be treated as read-only.
+    """
+    @functools.wraps(fn)
+    def wrapper(cube, *args, **kwargs):
+        key = (
+            fn.__name__,
+            cache_token(cube),
+            tuple(_freeze(a) for a in args),
+            tuple(sorted((k, _freeze(v)) for k, v in kwargs.items())),
+        )
+        result = chart_cache.get(key, _MISSING)
+        if result is _MISSING:
+            result = fn(cube, *args, **kwargs)
+            chart_cache.put(key, result)
+        return result
+    return wrapper
+
+
+# --- QUERY BACKEND ---
+# Both backends expose the same primitives taking the cube (or SQL handle)
+# first, so the chart functions below are written once for either.
+def _backend(cube):
+    return sql_backend if isinstance(cube, sql_backend.SqlCube) else pandas_backend
+
+
+def date_span(cube):
+    """First and last transaction date available to the charts."""
+    return _backend(cube).date_span(cube)
+
+
+def unit_values(cube):
+    """Every Quantity unit available to the charts, sorted."""
+    return _backend(cube).unit_values(cube)
+
+
+def cache_token(cube):
+    # A per-build sentinel held by the key: unlike id(cube), it can never be
+    # reused by a later cube once this one is garbage-collected
+    return cube.token if isinstance(cube, sql_backend.SqlCube) else cube['token']
+
+
+def approximation(cube):
+    """Sketch settings and error bounds when charts answer approximately, else None."""
+    return _backend(cube).approximation(cube)
+
+
+def _measure(mode):
+    return 'Amount' if mode == 'Amount' else 'quantity'
+
+
+# --- CHART AGGREGATIONS ---
+STAT_KEYS = ('amount', 'volume', 'transactions', 'suppliers')
+
+
+@memoized
+def stats_totals(cube, units, start=None, end=None):
+    """Totals behind the four stats cards, optionally within [start, end].
+
+    In approximate mode ``suppliers`` is a HyperLogLog estimate and
+    ``suppliers_error`` the half-width of its ~95% interval.
+    """
+    backend = _backend(cube)
+    totals = backend.window_totals(cube, units, start, end)
+    stats = {
+        'amount': totals['Amount'],
+        'volume': totals['quantity'],
+        'transactions': int(totals['rows']),
+    }
+    if backend.approximation(cube) is None:
+        stats['suppliers'] = backend.window_distinct_count(cube, 'Supplier', units, start, end)
+    else:
+        stats['suppliers'], stats['suppliers_error'] = backend.approx_distinct_count(
+            cube, 'Supplier', units, start, end
+        )
+    return stats
+
+
+@memoized
+def period_over_period(cube, units, start, end):
+    """Relative change of each stat against the equally long window just before.
+
+    Values are fractions (0.1 == +10%), or None when the previous window is
+    empty or starts before the data (a partial window is no fair baseline).
+    """
+    length = end - start
+    prev_end = start - datetime.timedelta(days=1)
+    prev_start = prev_end - length
+    if prev_start < date_span(cube)[0]:
+        return {key: None for key in STAT_KEYS}
+    current = stats_totals(cube, units, start, end)
+    previous = stats_totals(cube, units, prev_start, prev_end)
+    return {
+        key: (current[key] - previous[key]) / previous[key] if previous[key] else None
+        for key in STAT_KEYS
+    }
+
+
+@memoized
+def daily_trend(cube, units, start=None, end=None, smooth_days=None):
+    """Daily Amount/quantity for the Section 1 dual-axis chart.
+
+    ``start``/``end`` restrict to a date window located by binary search.
+    ``smooth_days`` replaces each value with its trailing calendar-window mean.
+    """
+    rows = _backend(cube).window_rows(cube, units, start, end)
+    daily = rows.groupby('Transaction Date', observed=True)[['Amount', 'quantity', 'rows']].sum().reset_index()
+    if smooth_days:
+        for measure in ('Amount', 'quantity'):
+            daily[measure] = trailing_mean(daily['Transaction Date'], daily[measure], smooth_days)
+    return daily
+
+
+def _top_ranked(cube, dim, unit, n, category=None):
+    # Approximate mode ranks from the heavy-hitter sketches (adds an amount_bound column)
+    backend = _backend(cube)
+    if backend.approximation(cube) is None:
+        return backend.top_ranked(cube, dim, unit, category=category, n=n)
+    return backend.approx_top_ranked(cube, dim, unit, category=category, n=n)
+
+
+@memoized
+def top_suppliers(cube, unit, n=4):
+    """The ``n`` suppliers with the highest Amount for one unit."""
+    return _top_ranked(cube, 'Supplier', unit, n)
+
+
+@memoized
+def category_split(cube, unit, mode):
+    """Category totals for the pie, sorted by the active mode."""
+    cat_data = _backend(cube).query(cube, ['category_group'], unit)
+    cat_data['sort_val'] = cat_data[_measure(mode)]
+    return cat_data.sort_values('sort_val', ascending=False).reset_index(drop=True)
+
+
+@memoized
+def top_products(cube, unit, category=None, n=5):
+    """The ``n`` products with the highest Amount, ascending for a horizontal bar."""
+    prod_agg = _top_ranked(cube, 'standardized_name', unit, n, category)
+    prod_agg = prod_agg.sort_values('Amount', ascending=True)
+    prod_agg['short_name'] = prod_agg['standardized_name'].apply(lambda x: x[:25] + '...' if len(x) > 25 else x)
+    return prod_agg
+
+
+# Resampling rules for the supplier trend; weeks start on Monday
+TREND_FREQUENCIES = {'Daily': 'D', 'Weekly': 'W-MON', 'Monthly': 'MS'}
+
+
+@memoized
+def supplier_trend(cube, unit, mode, n=4, freq='D', dense=True):
+    """Date x supplier matrix of the top ``n`` suppliers for one unit.
+
+    Built in one pass: the (supplier, date) roll-up is sliced to the top
+    suppliers and unstacked into columns ordered by rank. ``freq`` resamples
+    to weekly/monthly buckets. ``dense`` fills calendar gaps with zeros so
+    the line is continuous; without it only active periods are returned.
+    """
+    measure = _measure(mode)
+    top_sups = top_suppliers(cube, unit, n)['Supplier'].tolist()
+    sup_dates = _backend(cube).query(cube, ['Supplier', 'Transaction Date'], unit)
+    sup_dates = sup_dates[sup_dates['Supplier'].isin(top_sups)]
+
+    wide = (
+        sup_dates.groupby(['Transaction Date', 'Supplier'], observed=True)[measure].sum()
+        .unstack('Supplier', fill_value=0)
+        .reindex(columns=top_sups, fill_value=0)
+    )
+    wide.columns = list(wide.columns)
+    if wide.empty:
+        return wide
+
+    if dense:
+        # Pin the unit's full date span so the line covers the whole x-range
+        span = daily_trend(cube, unit)['Transaction Date']
+        wide = wide.reindex(wide.index.union(pd.DatetimeIndex([span.min(), span.max()]).unique()), fill_value=0)
+    wide.index.name = None
+    if freq != 'D':
+        # Resampling yields every bucket in range, so it is dense by construction
+        wide = wide.resample(freq, closed='left', label='left').sum()
+        if not dense:
+            wide = wide[wide.ne(0).any(axis=1)]
+    elif dense:
+        wide = wide.asfreq('D', fill_value=0)
+    return wide
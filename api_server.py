@@ -0,0 +1,322 @@
+"""Aggregation API for the HTML dashboard.
+
+Serves the same memoized chart aggregations as the Streamlit app as small
+JSON responses, so the browser no longer downloads and loops over raw rows:
+
+    python api_server.py --port 8001
+    # then open index.html?api=http://localhost:8001
+
+Every endpoint is a GET under /api/ returning JSON:
+
+    /api/units                                    units, date span, approximate-mode settings
+    /api/stats?unit=..&unit=..&start=&end=        stats cards (all units if none given)
+    /api/daily_trend?unit=..&start=&end=&smooth=  Section 1 daily series
+    /api/top_suppliers?unit=..&n=4
+    /api/category_split?unit=..&mode=Amount|Volume
+    /api/top_products?unit=..&category=..&n=5
+    /api/supplier_trend?unit=..&mode=..&n=4&freq=Daily|Weekly|Monthly&dense=1
+
+Encoded responses are held in an in-process LRU on top of the chart cache,
+carry a weak ETag (If-None-Match answers 304) and Cache-Control, and are
+compressed with brotli or gzip when the client accepts it. The dataset is
+reloaded in the background when the workbook or the store changes; each
+request reads one snapshot of it. With ``--approximate`` the stats and top-N
+endpoints answer from sketches and include their error bounds
+(``suppliers_error``, ``amount_bound``).
+"""
+import argparse
+import datetime
+import gzip
+import hashlib
+import json
+import os
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import pandas as pd
+
+from aggregations import (
+    TREND_FREQUENCIES, LRUCache, approximation, cache_token, category_split, daily_trend, date_span,
+    stats_totals, supplier_trend, top_products, top_suppliers, unit_values,
+)
+from data_store import SOURCE_FILE
+from live_dataset import LiveDataset
+from sketches import APPROXIMATE
+
+try:
+    import brotli
+except ImportError:  # optional: gzip is used when brotli is missing
+    brotli = None
+
+API_CACHE_MAX_AGE = int(os.environ.get('API_CACHE_MAX_AGE', 60))
+# Bodies shorter than this are sent uncompressed; the headers would outweigh the saving
+COMPRESS_MIN_BYTES = 512
+
+response_cache = LRUCache(max_entries=1024, max_bytes=32_000_000)
+
+
+# --- PARAMETERS ---
+class BadRequest(ValueError):
+    pass
+
+
+def _one(params, name, default=None):
+    values = params.get(name)
+    return values[-1] if values else default
+
+
+def _unit(params):
+    unit = _one(params, 'unit')
+    if unit is None:
+        raise BadRequest("'unit' is required")
+    return unit
+
+
+def _units(cube, params):
+    # Repeated ?unit=; no unit at all means every unit
+    return params.get('unit') or unit_values(cube)
+
+
+def _date(params, name):
+    value = _one(params, name)
+    try:
+        return datetime.date.fromisoformat(value) if value else None
+    except ValueError:
+        raise BadRequest(f'{name!r} must be YYYY-MM-DD, got {value!r}')
+
+
+def _int(params, name, default, minimum=1):
+    value = _one(params, name)
+    try:
+        number = int(value) if value else default
+    except ValueError:
+        raise BadRequest(f'{name!r} must be an integer, got {value!r}')
+    if number < minimum:
+        raise BadRequest(f'{name!r} must be at least {minimum}, got {number}')
+    return number
+
+
+def _mode(params):
+    mode = _one(params, 'mode', 'Amount').capitalize()
+    if mode not in ('Amount', 'Volume'):
+        raise BadRequest(f"'mode' must be Amount or Volume, got {mode!r}")
+    return mode
+
+
+def _window(cube, params):
+    # The full span is passed as None so it shares the unwindowed cached results
+    start, end = _date(params, 'start'), _date(params, 'end')
+    if (start, end) == date_span(cube):
+        return None, None
+    return start, end
+
+
+# --- JSON SHAPES ---
+def _dates(values):
+    return pd.DatetimeIndex(values).strftime('%Y-%m-%d').tolist()
+
+
+def _columns(frame, names):
+    # {'label': [...], 'amount': [...], 'volume': [...]} from one aggregation frame;
+    # approximate top-N frames also carry each Amount's upper error bound
+    if 'amount_bound' in frame:
+        names = {**names, 'amount_bound': 'amount_bound'}
+    return {key: frame[col].tolist() for key, col in names.items()}
+
+
+# --- ENDPOINTS ---
+def units_endpoint(cube, params):
+    start, end = date_span(cube)
+    return {
+        'units': unit_values(cube), 'date_min': start.isoformat(), 'date_max': end.isoformat(),
+        'approximate': approximation(cube),
+    }
+
+
+def stats_endpoint(cube, params):
+    return stats_totals(cube, _units(cube, params), *_window(cube, params))
+
+
+def daily_trend_endpoint(cube, params):
+    # smooth=0 (the default) means no rolling mean
+    smooth = _int(params, 'smooth', 0, minimum=0) or None
+    daily = daily_trend(cube, _units(cube, params), *_window(cube, params), smooth)
+    return {
+        'dates': _dates(daily['Transaction Date']),
+        'amount': daily['Amount'].tolist(),
+        'volume': daily['quantity'].tolist(),
+    }
+
+
+def top_suppliers_endpoint(cube, params):
+    ranked = top_suppliers(cube, _unit(params), _int(params, 'n', 4))
+    return _columns(ranked, {'supplier': 'Supplier', 'amount': 'Amount', 'volume': 'quantity'})
+
+
+def category_split_endpoint(cube, params):
+    split = category_split(cube, _unit(params), _mode(params))
+    return _columns(split, {'category': 'category_group', 'amount': 'Amount', 'volume': 'quantity'})
+
+
+def top_products_endpoint(cube, params):
+    category = _one(params, 'category') or None
+    ranked = top_products(cube, _unit(params), category, _int(params, 'n', 5))
+    # top_products is ascending for Plotly's horizontal bars; the API returns rank order
+    ranked = ranked.iloc[::-1]
+    return _columns(ranked, {'product': 'standardized_name', 'amount': 'Amount', 'volume': 'quantity'})
+
+
+def supplier_trend_endpoint(cube, params):
+    freq = _one(params, 'freq', 'Daily').capitalize()
+    if freq not in TREND_FREQUENCIES:
+        raise BadRequest(f"'freq' must be one of {list(TREND_FREQUENCIES)}, got {freq!r}")
+    dense = _one(params, 'dense', '1') not in ('0', 'false')
+    wide = supplier_trend(
+        cube, _unit(params), _mode(params), _int(params, 'n', 4), TREND_FREQUENCIES[freq], dense
+    )
+    return {
+        'dates': _dates(wide.index),
+        'series': [{'supplier': sup, 'values': wide[sup].tolist()} for sup in wide.columns],
+    }
+
+
+ENDPOINTS = {
+    '/api/units': units_endpoint,
+    '/api/stats': stats_endpoint,
+    '/api/daily_trend': daily_trend_endpoint,
+    '/api/top_suppliers': top_suppliers_endpoint,
+    '/api/category_split': category_split_endpoint,
+    '/api/top_products': top_products_endpoint,
+    '/api/supplier_trend': supplier_trend_endpoint,
+}
+
+
+# --- RESPONSES ---
+def _json_default(value):
+    # numpy scalars that survive .tolist(), e.g. in stats_totals
+    if hasattr(value, 'item'):
+        return value.item()
+    raise TypeError(f'{type(value).__name__} is not JSON serializable')
+
+
+def encode_response(result):
+    """``(body, etag, {encoding: compressed body})`` for one endpoint result."""
+    body = json.dumps(result, separators=(',', ':'), ensure_ascii=False, default=_json_default).encode('utf-8')
+    etag = 'W/"' + hashlib.sha256(body).hexdigest()[:20] + '"'
+    encoded = {}
+    if len(body) >= COMPRESS_MIN_BYTES:
+        encoded['gzip'] = gzip.compress(body, compresslevel=6, mtime=0)
+        if brotli is not None:
+            encoded['br'] = brotli.compress(body, quality=5)
+    return body, etag, encoded
+
+
+def cached_response(cube, path, params):
+    """Encoded response for ``path``, computed once per (query, dataset version)."""
+    key = (path, cache_token(cube), tuple(sorted((k, tuple(v)) for k, v in params.items())))
+    response = response_cache.get(key)
+    if response is None:
+        response = encode_response(ENDPOINTS[path](cube, params))
+        response_cache.put(key, response)
+    return response
+
+
+def _header_tokens(header):
+    # "gzip, br;q=0.9" -> {'gzip', 'br'}; also splits If-None-Match ETag lists
+    return {part.split(';')[0].strip() for part in (header or '').split(',')}
+
+
+class ApiHandler(BaseHTTPRequestHandler):
+    # Set by serve(); shared by every request thread
+    live = None
+    max_age = API_CACHE_MAX_AGE
+
+    def do_OPTIONS(self):
+        self.send_response(HTTPStatus.NO_CONTENT)
+        self._cors_headers()
+        self.end_headers()
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        if url.path not in ENDPOINTS:
+            return self._error(HTTPStatus.NOT_FOUND, f'unknown endpoint {url.path!r}; see {sorted(ENDPOINTS)}')
+        try:
+            cube = self.live.snapshot()['cube']
+            body, etag, encoded = cached_response(cube, url.path, parse_qs(url.query))
+        except BadRequest as e:
+            return self._error(HTTPStatus.BAD_REQUEST, str(e))
+
+        if etag in _header_tokens(self.headers.get('If-None-Match')):
+            self.send_response(HTTPStatus.NOT_MODIFIED)
+            self._cache_headers(etag)
+            self.end_headers()
+            return
+
+        accepted = _header_tokens(self.headers.get('Accept-Encoding', '').lower())
+        encoding = next((name for name in ('br', 'gzip') if name in encoded and name in accepted), None)
+        payload = encoded[encoding] if encoding else body
+        self.send_response(HTTPStatus.OK)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(payload)))
+        if encoding:
+            self.send_header('Content-Encoding', encoding)
+        self._cache_headers(etag)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _cors_headers(self):
+        # The dashboard is usually served from another port (or file://)
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.send_header('Access-Control-Allow-Headers', 'If-None-Match')
+        self.send_header('Access-Control-Expose-Headers', 'ETag')
+
+    def _cache_headers(self, etag):
+        self.send_header('ETag', etag)
+        self.send_header('Cache-Control', f'public, max-age={self.max_age}')
+        self.send_header('Vary', 'Accept-Encoding')
+        self._cors_headers()
+
+    def _error(self, status, message):
+        body = json.dumps({'error': message}).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self._cors_headers()
+        self.end_headers()
+        self.wfile.write(body)
+
+
+# --- SERVER ---
+def serve(live, host='127.0.0.1', port=8001, max_age=API_CACHE_MAX_AGE):
+    ApiHandler.live = live
+    ApiHandler.max_age = max_age
+    server = ThreadingHTTPServer((host, port), ApiHandler)
+    print(f'Aggregation API on http://{host}:{server.server_port}/api/ (Ctrl+C to stop)')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve chart aggregations as JSON for the HTML dashboard.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8001)
+    parser.add_argument('--source', default=SOURCE_FILE, help='Workbook used when no store exists')
+    parser.add_argument('--backend', choices=['pandas', 'duckdb'],
+                        default=os.environ.get('DASHBOARD_BACKEND', 'pandas').lower())
+    parser.add_argument('--max-age', type=int, default=API_CACHE_MAX_AGE,
+                        help='Cache-Control max-age in seconds (default: %(default)s)')
+    parser.add_argument('--approximate', action='store_true', default=APPROXIMATE,
+                        help='answer distinct counts and top-N from sketches (pandas backend; '
+                             'default: DASHBOARD_APPROXIMATE)')
+    args = parser.parse_args()
+    live = LiveDataset(args.backend, args.source, approximate=args.approximate)
+    serve(live.start(), args.host, args.port, args.max_age)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,9 +1,17 @@
+import os
+
 import streamlit as st
 import pandas as pd
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
 import numpy as np
 
+from aggregations import (
+    TREND_FREQUENCIES, approximation, category_split, chart_cache, date_span, period_over_period,
+    stats_totals, unit_values,
+)
+from live_dataset import LiveDataset
+from figures import category_figure, products_figure, supplier_trend_figure, suppliers_figure, trend_figure
+from instrumentation import fragment_timer, instrumentation_enabled, start_rerun
+
 # Page config
 st.set_page_config(
     page_title="Tetra Pak Analytics Dashboard",
@@ -250,133 +258,166 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 # --- LOADING DATA ---
-@st.cache_data
-def load_data():
+# 'pandas' keeps an in-memory cube; 'duckdb' runs each chart as SQL over the
+# Parquet files, for datasets that do not fit in RAM. Both give the same charts.
+QUERY_BACKEND = os.environ.get('DASHBOARD_BACKEND', 'pandas').lower()
+
+# cache_resource: one LiveDataset per server process, shared by all sessions. Its
+# background thread rebuilds the cube when the workbook changes or batches are
+# appended, then swaps it in; no rerun ever waits on a rebuild.
+@st.cache_resource
+def load_live_dataset():
     try:
-        df = pd.read_excel('tetra_pak_final_data_finish.xlsx')
-        df['Transaction Date'] = pd.to_datetime(df['Transaction Date'], errors='coerce')
-        df = df.dropna(subset=['Transaction Date'])
-        df['Amount'] = pd.to_numeric(df['Amount'], errors='coerce').fillna(0)
-        df['quantity'] = pd.to_numeric(df['quantity'], errors='coerce').fillna(0)
-        df['Quantity unit'] = df['Quantity unit'].astype(str).str.strip().fillna('Unknown')
-        df['category_group'] = df['category_group'].astype(str).fillna('Unknown')
-        df['standardized_name'] = df['standardized_name'].astype(str).fillna('Unknown')
-        df['Supplier'] = df['Supplier'].astype(str).fillna('Unknown')
-        return df
+        # Parsed once into a Parquet cache; rebuilt only when the workbook changes.
+        # Once prepare_data.py --append has created a store, the store is read instead.
+        return LiveDataset(QUERY_BACKEND).start()
     except Exception as e:
         return None
 
-df = load_data()
+# --- INSTRUMENTATION ---
+# Off by default (a no-op timer); DASHBOARD_INSTRUMENT=1 or ?debug=1 turns it on.
+# Each timer.lap(name) charges the time since the previous lap to `name`.
+timer = start_rerun(st.session_state, instrumentation_enabled(st.query_params), backend=QUERY_BACKEND)
+cache_before = chart_cache.stats() if timer.enabled else None
 
-if df is None:
+live = load_live_dataset()
+if live is None:
     st.error("⚠️ Error loading 'tetra_pak_final_data_finish.xlsx'. Please check if the file exists.")
     st.stop()
 
+# One snapshot per rerun: a reload finishing mid-rerun shows up on the next one.
+# Pre-aggregated roll-ups (or the SQL view): every chart below reads these, not the raw rows.
+snapshot = live.snapshot()
+cube = snapshot['cube']
+timer.lap('load')
+
 # --- HEADER ---
 st.markdown("<h1>Tetra Pak Analytics Dashboard</h1>", unsafe_allow_html=True)
 st.markdown("<p class='header-subtitle'>Real-time insights and performance metrics</p>", unsafe_allow_html=True)
 
+# Approximate mode (DASHBOARD_APPROXIMATE=1): say which values are estimates and how close
+approx = approximation(cube)
+if approx is not None:
+    st.info(
+        f"≈ Approximate mode: Active Suppliers is a HyperLogLog estimate "
+        f"(±{2 * approx['distinct_relative_error']:.1%} at ~95%), and Top Suppliers / Top Products are "
+        f"ranked from per-day heavy-hitter summaries ({approx['heavy_hitters_per_day']} counters per day). "
+        "Their Amount bars show the guaranteed minimum, with error bars up to the possible maximum."
+    )
+
+
+units_available = unit_values(cube)
 
 # --- SECTION 1 & GLOBAL STATS FILTER ---
 # Logic: Controls Stats Cards + Section 1 Chart
 st.markdown("<div class='section-header'>📈 Global Overview (Section 1)</div>", unsafe_allow_html=True)
 
-col_f1, col_f2 = st.columns([1, 3])
-with col_f1:
-    # "Select All" toggle
-    select_all_units = st.checkbox("Select All Units", value=True)
-
-with col_f2:
-    units_available = sorted(df['Quantity unit'].unique())
-    if select_all_units:
-        st.info("All units selected (Global Stats & Section 1)")
-        selected_units_s1 = units_available
-        current_units_label = "All Units"
+# Its widgets (units, dates, smoothing) rerun only this fragment, not Section 2
+@st.fragment
+def global_overview(cube, units_available):
+    frag_timer, owns_timer = fragment_timer(st.session_state, 'global_overview', backend=QUERY_BACKEND)
+
+    col_f1, col_f2 = st.columns([1, 3])
+    with col_f1:
+        # "Select All" toggle
+        select_all_units = st.checkbox("Select All Units", value=True)
+
+    with col_f2:
+        if select_all_units:
+            st.info("All units selected (Global Stats & Section 1)")
+            selected_units_s1 = units_available
+            current_units_label = "All Units"
+        else:
+            selected_units_s1 = st.multiselect(
+                "Select specific units:",
+                options=units_available,
+                default=[],
+                placeholder="Choose units..."
+            )
+            current_units_label = f"{len(selected_units_s1)} Selected" if selected_units_s1 else "None"
+
+    # Date window for Stats + Section 1, answered from per-unit prefix sums
+    data_start, data_end = date_span(cube)
+    col_d1, col_d2 = st.columns([3, 1])
+    with col_d1:
+        date_window = st.date_input(
+            "Date range:",
+            value=(data_start, data_end),
+            min_value=data_start,
+            max_value=data_end
+        )
+    with col_d2:
+        smooth_trend = st.checkbox("7-day moving average", value=False)
+
+    # The range picker returns a single date until the second click
+    if isinstance(date_window, (tuple, list)) and len(date_window) == 2:
+        window_start, window_end = date_window
     else:
-        selected_units_s1 = st.multiselect(
-            "Select specific units:",
-            options=units_available,
-            default=[],
-            placeholder="Choose units..."
+        window_start, window_end = data_start, data_end
+    # The full span is passed as None so it shares the unwindowed cached results
+    if (window_start, window_end) == (data_start, data_end):
+        window_start = window_end = None
+
+    # Apply Filter for Section 1 / Stats
+    if not selected_units_s1:
+        st.warning("Please select at least one unit to view stats.")
+    frag_timer.lap('filters')
+
+    # --- STATS CARDS ---
+    col1, col2, col3, col4 = st.columns(4)
+
+    # Memoized on (unit selection, date window); cached results are shared -- never mutate them
+    stats_s1 = stats_totals(cube, selected_units_s1, window_start, window_end)
+    total_amount = stats_s1['amount']
+    total_volume = stats_s1['volume']
+    total_tx = stats_s1['transactions']
+    active_suppliers = stats_s1['suppliers']
+
+    # Change vs the equally long window just before the selected one
+    deltas_s1 = {}
+    if window_start is not None:
+        deltas_s1 = period_over_period(cube, selected_units_s1, window_start, window_end)
+    frag_timer.lap('stats.query')
+
+    def delta_label(key):
+        change = deltas_s1.get(key)
+        return None if change is None else f"{change:+.1%} vs prev. period"
+
+    with col1:
+        st.metric("Total Amount", f"${total_amount:,.0f}", delta=delta_label('amount'))
+    with col2:
+        st.metric("Total Volume", f"{total_volume:,.0f}", delta=delta_label('volume'))
+    with col3:
+        st.metric("Transactions", f"{total_tx:,}", delta=delta_label('transactions'))
+    with col4:
+        if 'suppliers_error' in stats_s1:
+            st.metric(
+                "Active Suppliers (≈)", f"≈{active_suppliers}", delta=delta_label('suppliers'),
+                help=f"HyperLogLog estimate, ±{stats_s1['suppliers_error']} at ~95%",
+            )
+        else:
+            st.metric("Active Suppliers", f"{active_suppliers}", delta=delta_label('suppliers'))
+    frag_timer.lap('stats.render')
+
+
+    # --- OVERTIME ANALYSIS CHART (Section 1) ---
+    if total_tx > 0:
+        # Built figure memoized per (units, window, smoothing, label) and dataset version
+        fig_trend = trend_figure(
+            cube, selected_units_s1, window_start, window_end, 7 if smooth_trend else None, current_units_label
         )
-        current_units_label = f"{len(selected_units_s1)} Selected" if selected_units_s1 else "None"
-
-# Apply Filter for Section 1 / Stats
-if not selected_units_s1:
-    df_s1 = df.iloc[0:0] # Empty
-    st.warning("Please select at least one unit to view stats.")
-else:
-    df_s1 = df[df['Quantity unit'].isin(selected_units_s1)]
-
-# --- STATS CARDS ---
-col1, col2, col3, col4 = st.columns(4)
-
-total_amount = df_s1['Amount'].sum()
-total_volume = df_s1['quantity'].sum()
-total_tx = len(df_s1)
-active_suppliers = df_s1['Supplier'].nunique()
-
-with col1:
-    st.metric("Total Amount", f"${total_amount:,.0f}")
-with col2:
-    st.metric("Total Volume", f"{total_volume:,.0f}")
-with col3:
-    st.metric("Transactions", f"{total_tx:,}")
-with col4:
-    st.metric("Active Suppliers", f"{active_suppliers}")
-
-
-# --- OVERTIME ANALYSIS CHART (Section 1) ---
-if not df_s1.empty:
-    daily_data = df_s1.groupby('Transaction Date').agg({
-        'Amount': 'sum',
-        'quantity': 'sum'
-    }).reset_index().sort_values('Transaction Date')
-
-    fig_trend = make_subplots(specs=[[{"secondary_y": True}]])
-    
-    # Amount Line (matching HTML dashboard)
-    fig_trend.add_trace(
-        go.Scatter(
-            x=daily_data['Transaction Date'],
-            y=daily_data['Amount'],
-            name="Total Amount (USD)",
-            line=dict(color='#1f77b4', width=3),
-            fill='tozeroy',
-            fillcolor='rgba(31, 119, 180, 0.1)'
-        ), secondary_y=False
-    )
+        frag_timer.lap('trend.figure')
 
-    # Volume Line (matching HTML dashboard)
-    fig_trend.add_trace(
-        go.Scatter(
-            x=daily_data['Transaction Date'],
-            y=daily_data['quantity'],
-            name=f"Quantity ({current_units_label})",
-            line=dict(color='#ff7f0e', width=3, dash='dot'),
-            fill='tozeroy',
-            fillcolor='rgba(255, 127, 14, 0.1)'
-        ), secondary_y=True
-    )
+        st.markdown("<div class='chart-box'>", unsafe_allow_html=True)
+        st.plotly_chart(fig_trend, use_container_width=True)
+        st.markdown("</div>", unsafe_allow_html=True)
+        frag_timer.lap('trend.render')
 
-    fig_trend.update_layout(
-        title=dict(text=f"Financial vs Volume Analysis", font=dict(color="#e2e8f0", size=16)),
-        hovermode='x unified',
-        plot_bgcolor='rgba(15, 23, 42, 0.3)',
-        paper_bgcolor='rgba(0, 0, 0, 0)',
-        font=dict(color='#94a3b8'),
-        height=500,
-        margin=dict(l=20, r=20, t=50, b=20),
-        legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1, font=dict(color='#e2e8f0'))
-    )
+    if owns_timer:
+        frag_timer.finish(dataset_version=snapshot['version'])
 
-    fig_trend.update_xaxes(showgrid=True, gridcolor='rgba(148, 163, 184, 0.1)')
-    fig_trend.update_yaxes(title_text="Total Amount (USD)", title_font=dict(color="#1f77b4", weight='bold'), secondary_y=False, showgrid=True, gridcolor='rgba(148, 163, 184, 0.1)')
-    fig_trend.update_yaxes(title_text="Quantity", title_font=dict(color="#ff7f0e", weight='bold'), secondary_y=True, showgrid=False)
 
-    st.markdown("<div class='chart-box'>", unsafe_allow_html=True)
-    st.plotly_chart(fig_trend, use_container_width=True)
-    st.markdown("</div>", unsafe_allow_html=True)
+global_overview(cube, units_available)
 
 
 # --- SECTION 2: DETAILED ANALYTICS ---
@@ -398,269 +439,153 @@ selected_unit_s2 = st.selectbox(
     options=units_available,
     index=0
 )
+timer.lap('detail.filter')
 
-df_s2 = df[df['Quantity unit'] == selected_unit_s2]
 
-# --- Row 1 of Charts ---
+# --- Row 1 of Charts: suppliers ---
 col_charts_1, col_charts_2 = st.columns(2)
 
 # 1. Top 4 Suppliers
 with col_charts_1:
-    supplier_data = df_s2.groupby('Supplier').agg({'Amount': 'sum', 'quantity': 'sum'}).reset_index()
-    supplier_data = supplier_data.nlargest(4, 'Amount')
-    
-    fig_sup = make_subplots(specs=[[{"secondary_y": True}]])
-    
-    # Amount Bar (matching HTML dashboard)
-    fig_sup.add_trace(go.Bar(
-        x=supplier_data['Supplier'], y=supplier_data['Amount'], name='Amount (USD)',
-        marker_color='rgba(139, 92, 246, 0.8)',
-        marker_line=dict(color='rgba(139, 92, 246, 1)', width=2),
-        offsetgroup=1
-    ), secondary_y=False)
-
-    # Volume Bar (matching HTML dashboard)
-    fig_sup.add_trace(go.Bar(
-        x=supplier_data['Supplier'], y=supplier_data['quantity'], name='Volume',
-        marker_color='rgba(59, 130, 246, 0.8)',
-        marker_line=dict(color='rgba(59, 130, 246, 1)', width=2),
-        offsetgroup=2
-    ), secondary_y=True)
-
-    fig_sup.update_layout(
-        title=dict(text="Top 4 Suppliers", font=dict(color="#e2e8f0", size=16)),
-        plot_bgcolor='rgba(15, 23, 42, 0.3)',
-        paper_bgcolor='rgba(0, 0, 0, 0)',
-        font=dict(color='#94a3b8'),
-        height=450,
-        barmode='group',
-        legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1, font=dict(color='#e2e8f0'))
-    )
-    fig_sup.update_xaxes(showgrid=False)
-    fig_sup.update_yaxes(title_text="Amount (USD)", title_font=dict(color="#8b5cf6", weight='bold'), secondary_y=False, showgrid=True, gridcolor='rgba(148, 163, 184, 0.1)')
-    fig_sup.update_yaxes(title_text="Volume (Quantity)", title_font=dict(color="#3b82f6", weight='bold'), secondary_y=True, showgrid=False)
-    
+    fig_sup = suppliers_figure(cube, selected_unit_s2, 4)
+    timer.lap('suppliers.figure')
+
     st.markdown("<div class='chart-box'>", unsafe_allow_html=True)
     st.plotly_chart(fig_sup, use_container_width=True)
     st.markdown("</div>", unsafe_allow_html=True)
+    timer.lap('suppliers.render')
 
-# 2. Category Distribution (Pie) - Click to Filter!
-with col_charts_2:
+
+# 2. Top 4 Suppliers Trend (Continuous): its mode/granularity radios rerun only this chart
+@st.fragment
+def supplier_trend_block(cube, unit):
+    frag_timer, owns_timer = fragment_timer(st.session_state, 'supplier_trend', backend=QUERY_BACKEND)
     st.markdown("<div class='chart-box'>", unsafe_allow_html=True)
+    
+    trend_mode = st.radio("View Trend by:", ["Amount", "Volume"], horizontal=True, key="trend_mode_s2")
+    trend_freq = st.radio("Granularity:", list(TREND_FREQUENCIES), horizontal=True, key="trend_freq_s2")
+    
+    # Date x supplier matrix and its figure, memoized per (unit, mode, granularity)
+    fig_comp = supplier_trend_figure(cube, unit, trend_mode, 4, TREND_FREQUENCIES[trend_freq])
+    frag_timer.lap('supplier_trend.figure')
 
-    # Initialize Session State
-    if "selected_category" not in st.session_state:
-        st.session_state["selected_category"] = None
-    if "pie_mode" not in st.session_state:
-        st.session_state["pie_mode"] = "Amount"
+    st.plotly_chart(fig_comp, use_container_width=True)
+    st.markdown("</div>", unsafe_allow_html=True)
+    frag_timer.lap('supplier_trend.render')
 
-    # Toggle buttons for Amount/Volume
-    col_toggle1, col_toggle2 = st.columns(2)
-    with col_toggle1:
-        if st.button("Amount", key="pie_amount_btn", use_container_width=True):
-            st.session_state["pie_mode"] = "Amount"
-    with col_toggle2:
-        if st.button("Volume", key="pie_volume_btn", use_container_width=True):
-            st.session_state["pie_mode"] = "Volume"
-
-    pie_mode = st.session_state.get("pie_mode", "Amount")
-
-    cat_data = df_s2.groupby('category_group').agg({'Amount': 'sum', 'quantity': 'sum'}).reset_index()
-    values = cat_data['Amount'] if pie_mode == 'Amount' else cat_data['quantity']
-
-    # Colors: Matching HTML dashboard exactly
-    pie_colors = ['#8b5cf6', '#3b82f6', '#06b6d4', '#10b981', '#f59e0b', '#ef4444', '#ec4899', '#6366f1', '#14b8a6', '#f97316']
-
-    # Sort Data Explicitly (Deterministic Order)
-    cat_data['sort_val'] = values
-    cat_data = cat_data.sort_values('sort_val', ascending=False).reset_index(drop=True)
-
-    # Calculate percentages for labels
-    total = cat_data['sort_val'].sum()
-    sorted_labels_with_pct = [f"{label} ({(val/total*100):.1f}%)"
-                               for label, val in zip(cat_data['category_group'], cat_data['sort_val'])]
-
-    fig_pie = go.Figure(data=[go.Pie(
-        labels=sorted_labels_with_pct,
-        values=cat_data['sort_val'],
-        hole=0.4,
-        marker=dict(
-            colors=pie_colors,
-            line=dict(color='#1e293b', width=3)
-        ),
-        textinfo='percent',
-        textfont=dict(size=12, color='#fff', family='Inter'),
-        textposition='inside',
-        insidetextorientation='horizontal',
-        hovertemplate='<b>%{label}</b><br>Value: %{value:,.0f}<extra></extra>',
-        sort=False
-    )])
-
-    fig_pie.update_layout(
-        title=dict(text="Category Distribution", font=dict(color="#e2e8f0", size=16, weight='bold')),
-        plot_bgcolor='rgba(0, 0, 0, 0)',
-        paper_bgcolor='rgba(0, 0, 0, 0)',
-        font=dict(color='#e2e8f0'),
-        height=400,
-        showlegend=True,
-        legend=dict(
-            orientation="v",
-            yanchor="middle",
-            y=0.5,
-            xanchor="left",
-            x=1.02,
-            font=dict(color='#e2e8f0', size=11),
-            bgcolor='rgba(0, 0, 0, 0)',
-            itemsizing='constant'
-        ),
-        margin=dict(t=50, b=10, l=10, r=120),
-    )
+    if owns_timer:
+        frag_timer.finish(dataset_version=snapshot['version'])
 
-    # Interactive Pie Chart - Click to filter!
-    event = st.plotly_chart(
-        fig_pie,
-        use_container_width=True,
-        key="pie_chart_interactive",
-        on_select="rerun",
-        selection_mode="points"
-    )
 
-    # Handle click event
-    if event and "selection" in event and "points" in event["selection"]:
-        points = event["selection"]["points"]
-        if len(points) > 0:
-            point_index = points[0]["point_index"]
-            clicked_category = cat_data['category_group'].iloc[point_index]
-            if st.session_state.get("selected_category") != clicked_category:
+with col_charts_2:
+    supplier_trend_block(cube, selected_unit_s2)
+
+
+# --- Row 2 of Charts: category pie -> products ---
+# Pie + products: the Amount/Volume buttons and a slice click rerun only these two
+# charts. The products chart is drawn after the click is handled, so it follows the
+# clicked category in the same fragment run.
+@st.fragment
+def category_products_block(cube, unit):
+    frag_timer, owns_timer = fragment_timer(st.session_state, 'category_products', backend=QUERY_BACKEND)
+    col_charts_3, col_charts_4 = st.columns(2)
+
+    # 3. Category Distribution (Pie) - Click to Filter!
+    with col_charts_3:
+        st.markdown("<div class='chart-box'>", unsafe_allow_html=True)
+
+        # Initialize Session State
+        if "selected_category" not in st.session_state:
+            st.session_state["selected_category"] = None
+        if "pie_mode" not in st.session_state:
+            st.session_state["pie_mode"] = "Amount"
+
+        # Toggle buttons for Amount/Volume
+        col_toggle1, col_toggle2 = st.columns(2)
+        with col_toggle1:
+            if st.button("Amount", key="pie_amount_btn", use_container_width=True):
+                st.session_state["pie_mode"] = "Amount"
+        with col_toggle2:
+            if st.button("Volume", key="pie_volume_btn", use_container_width=True):
+                st.session_state["pie_mode"] = "Volume"
+
+        pie_mode = st.session_state.get("pie_mode", "Amount")
+
+        # Sorted by the active mode (deterministic order), memoized per (unit, mode)
+        cat_data = category_split(cube, unit, pie_mode)
+        frag_timer.lap('categories.query')
+
+        fig_pie = category_figure(cube, unit, pie_mode)
+        frag_timer.lap('categories.figure')
+
+        # Interactive Pie Chart - Click to filter!
+        event = st.plotly_chart(
+            fig_pie,
+            use_container_width=True,
+            key="pie_chart_interactive",
+            on_select="rerun",
+            selection_mode="points"
+        )
+        frag_timer.lap('categories.render')
+
+        # Handle click event
+        if event and "selection" in event and "points" in event["selection"]:
+            points = event["selection"]["points"]
+            if len(points) > 0:
+                point_index = points[0]["point_index"]
+                clicked_category = cat_data['category_group'].iloc[point_index]
                 st.session_state["selected_category"] = clicked_category
-                st.rerun()
 
-    st.markdown("</div>", unsafe_allow_html=True)
+        st.markdown("</div>", unsafe_allow_html=True)
 
+    # 4. Top 5 Products (Filtered by Category Click)
+    with col_charts_4:
+        st.markdown("<div class='chart-box'>", unsafe_allow_html=True)
 
-# --- Row 2 of Charts ---
-col_charts_3, col_charts_4 = st.columns(2)
+        # Use State from pie chart click
+        cat_filter_val = st.session_state.get("selected_category", None)
 
-# 3. Top 5 Products (Filtered by Category Click)
-with col_charts_3:
-    st.markdown("<div class='chart-box'>", unsafe_allow_html=True)
+        # Figure memoized per (unit, category); "All" shows every category
+        category_filter = cat_filter_val if cat_filter_val and cat_filter_val != "All" else None
+        fig_prod = products_figure(cube, unit, category_filter, 5)
+        frag_timer.lap('products.figure')
 
-    # Use State from pie chart click
-    cat_filter_val = st.session_state.get("selected_category", None)
+        st.plotly_chart(fig_prod, use_container_width=True)
+        st.markdown("</div>", unsafe_allow_html=True)
+        frag_timer.lap('products.render')
 
-    # Logic to filter DataFrame
-    if cat_filter_val and cat_filter_val != "All":
-        prod_df = df_s2[df_s2['category_group'] == cat_filter_val]
-        chart_title = f"Top 5 in {cat_filter_val}"
-    else:
-        prod_df = df_s2
-        chart_title = "Top 5 Products"
-    
-    prod_agg = prod_df.groupby('standardized_name').agg({'Amount': 'sum', 'quantity': 'sum'}).reset_index()
-    prod_agg = prod_agg.nlargest(5, 'Amount')
-    prod_agg = prod_agg.sort_values('Amount', ascending=True) 
-    
-    prod_agg['short_name'] = prod_agg['standardized_name'].apply(lambda x: x[:25] + '...' if len(x)>25 else x)
+    if owns_timer:
+        frag_timer.finish(dataset_version=snapshot['version'])
 
-    
-    # Dual Axis Horizontal Bar
-    fig_prod = go.Figure()
-
-    # Amount (Axis 1 - Bottom) - matching HTML dashboard
-    fig_prod.add_trace(go.Bar(
-        y=prod_agg['short_name'],
-        x=prod_agg['Amount'],
-        name='Amount (USD)',
-        orientation='h',
-        marker_color='rgba(16, 185, 129, 0.8)',
-        marker_line=dict(color='rgba(16, 185, 129, 1)', width=2),
-        offsetgroup=1
-    ))
-
-    # Volume (Axis 2 - Top) - matching HTML dashboard
-    fig_prod.add_trace(go.Bar(
-        y=prod_agg['short_name'],
-        x=prod_agg['quantity'],
-        name='Volume',
-        orientation='h',
-        marker_color='rgba(245, 158, 11, 0.8)',
-        marker_line=dict(color='rgba(245, 158, 11, 1)', width=2),
-        offsetgroup=2,
-        xaxis='x2'
-    ))
-
-    fig_prod.update_layout(
-        title=dict(text=chart_title, font=dict(color="#e2e8f0", size=16)),
-        plot_bgcolor='rgba(15, 23, 42, 0.3)',
-        paper_bgcolor='rgba(0, 0, 0, 0)',
-        font=dict(color='#94a3b8'),
-        height=450,
-        barmode='group',
-        legend=dict(orientation="h", yanchor="bottom", y=1.05, xanchor="right", x=1, font=dict(color='#e2e8f0')),
-        xaxis=dict(
-            title="Amount (USD)",
-            title_font=dict(color="#10b981", weight='bold'),
-            tickfont=dict(color='#94a3b8'),
-            showgrid=True,
-            gridcolor='rgba(148, 163, 184, 0.1)',
-        ),
-        xaxis2=dict(
-            title="Volume",
-            title_font=dict(color="#f59e0b", weight='bold'),
-            tickfont=dict(color='#94a3b8'),
-            showgrid=False,
-            overlaying='x',
-            side='top'
-        ),
-        yaxis=dict(showgrid=False)
-    )
-    
-    st.plotly_chart(fig_prod, use_container_width=True)
-    st.markdown("</div>", unsafe_allow_html=True)
 
+category_products_block(cube, selected_unit_s2)
 
-# 4. Top 4 Suppliers Trend (Continuous)
-with col_charts_4:
-    st.markdown("<div class='chart-box'>", unsafe_allow_html=True)
-    
-    trend_mode = st.radio("View Trend by:", ["Amount", "Volume"], horizontal=True, key="trend_mode_s2")
-    
-    top_sups = df_s2.groupby('Supplier')['Amount'].sum().nlargest(4).index.tolist()
-    
-    full_date_range = pd.date_range(start=df_s2['Transaction Date'].min(), end=df_s2['Transaction Date'].max(), freq='D')
-    
-    fig_comp = go.Figure()
-    # Colors matching HTML dashboard exactly
-    colors = ['#8b5cf6', '#3b82f6', '#10b981', '#f59e0b']
-
-    for i, sup in enumerate(top_sups):
-        sup_df = df_s2[df_s2['Supplier'] == sup]
-        sup_daily = sup_df.groupby('Transaction Date').agg({'Amount': 'sum', 'quantity': 'sum'}).reindex(full_date_range).fillna(0).reset_index()
-        sup_daily.rename(columns={'index': 'Transaction Date'}, inplace=True)
-
-        y_val = sup_daily['Amount'] if trend_mode == 'Amount' else sup_daily['quantity']
-
-        fig_comp.add_trace(go.Scatter(
-            x=sup_daily['Transaction Date'], y=y_val, name=sup,
-            line=dict(color=colors[i%len(colors)], width=3)
-        ))
-
-    fig_comp.update_layout(
-        title=dict(text="Top 4 Suppliers Trend (Continuous)", font=dict(color="#e2e8f0", size=16)),
-        plot_bgcolor='rgba(15, 23, 42, 0.3)',
-        paper_bgcolor='rgba(0, 0, 0, 0)',
-        font=dict(color='#94a3b8'),
-        height=450,
-        hovermode='x unified',
-        legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1, font=dict(color='#e2e8f0'))
-    )
-    fig_comp.update_xaxes(showgrid=True, gridcolor='rgba(148, 163, 184, 0.1)')
-    fig_comp.update_yaxes(
-        showgrid=True,
-        gridcolor='rgba(148, 163, 184, 0.1)',
-        title_text="Amount (USD)" if trend_mode == 'Amount' else "Volume (Quantity)",
-        title_font=dict(color="#8b5cf6", weight='bold')
+
+# --- DEBUG PANEL ---
+# Section timings of this rerun; the same record is logged as one JSON line.
+# Chart-cache counters are process-wide, so concurrent sessions show up in them too.
+if timer.enabled:
+    cache_after = chart_cache.stats()
+    rerun_record = timer.finish(
+        dataset_version=snapshot['version'],
+        cache_hits=cache_after['hits'] - cache_before['hits'],
+        cache_misses=cache_after['misses'] - cache_before['misses'],
     )
-    
-    st.plotly_chart(fig_comp, use_container_width=True)
-    st.markdown("</div>", unsafe_allow_html=True)
+    with st.expander(f"⏱️ Timings (rerun {timer.rerun_id})", expanded=False):
+        st.caption(
+            f"{rerun_record['total_ms']:,.1f} ms total · {QUERY_BACKEND} backend · dataset v{snapshot['version']} · chart cache "
+            f"{rerun_record['cache_hits']} hits / {rerun_record['cache_misses']} misses this rerun, "
+            f"{cache_after['entries']} entries held"
+        )
+        timings = pd.DataFrame(timer.sections, columns=['section', 'seconds'])
+        timings['ms'] = timings['seconds'] * 1000
+        timings['share'] = timings['seconds'] / timer.total if timer.total else 0.0
+        st.dataframe(
+            timings[['section', 'ms', 'share']],
+            hide_index=True,
+            use_container_width=True,
+            column_config={
+                'ms': st.column_config.NumberColumn('ms', format='%.2f'),
+                'share': st.column_config.ProgressColumn('share', min_value=0.0, max_value=1.0, format='%.2f'),
+            },
+        )
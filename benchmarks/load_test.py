@@ -0,0 +1,356 @@
+"""Concurrent-session load test for the Streamlit app.
+
+Drives ``app.py`` headlessly with Streamlit's AppTest: N simulated sessions,
+each in its own thread of this process, so they share the app's
+``st.cache_resource`` dataset and the chart cache exactly as browser tabs
+on one server do. Every session loads the page, then replays a seeded random
+interaction script: Section 1 unit multiselects, Section 2 unit changes, pie
+clicks, the pie's Amount/Volume buttons and the supplier-trend radios.
+
+For each session count it reports p50/p95/p99 rerun latency, reruns per
+second and the process RSS (sampled while the sessions run):
+
+    python benchmarks/load_test.py --sessions 1 2 4 8 --steps 20
+    python benchmarks/load_test.py --backend duckdb --think-ms 500
+
+Latencies are upper bounds for the fragment-scoped widgets: AppTest reruns
+the whole script for every interaction and includes its own message parsing.
+A pie click is replayed through the state the click handler sets
+(``selected_category``), since AppTest cannot emit Plotly selection events.
+Each session count starts from an empty chart cache. Results are written as
+JSON to ``benchmarks/results/load-<timestamp>-<commit>.json``.
+"""
+import argparse
+import datetime
+import inspect
+import json
+import os
+import random
+import resource
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np  # noqa: E402
+from streamlit.testing.v1 import AppTest  # noqa: E402
+
+from aggregations import chart_cache  # noqa: E402
+from run_benchmarks import RESULTS_DIR, environment  # noqa: E402
+
+APP_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'app.py')
+PERCENTILES = (50, 95, 99)
+# Relative frequency of each interaction in a replayed session
+ACTION_WEIGHTS = {
+    'detail.unit': 3,
+    'pie.click': 3,
+    'units.multiselect': 2,
+    'pie.mode': 2,
+    'units.select_all': 1,
+    'trend.mode': 1,
+    'trend.freq': 1,
+}
+
+
+# --- RSS ---
+def current_rss_mb():
+    """Resident set size of this process now (Linux), else the high-water mark."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 1e6
+    except (OSError, ValueError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class RssSampler(threading.Thread):
+    # Polls RSS while a level runs; the peak is what a container limit would see
+    def __init__(self, interval=0.05):
+        super().__init__(name='rss-sampler', daemon=True)
+        self.interval = interval
+        self.samples = []
+        self._done = threading.Event()
+
+    def run(self):
+        while not self._done.is_set():
+            self.samples.append(current_rss_mb())
+            self._done.wait(self.interval)
+
+    def stop(self):
+        self._done.set()
+        self.join()
+        self.samples.append(current_rss_mb())
+
+
+# --- CONCURRENT APPTEST ---
+# Streamlit releases whose AppTest internals the patches below were checked against
+TESTED_STREAMLIT = ('1.37', '1.65')
+
+
+def _check_apptest_internals():
+    """Exit with a clear message unless the internals patched below are as expected.
+
+    The patches rely on private Streamlit attributes, so a Streamlit
+    upgrade that renames or reshapes them must stop the run here rather
+    than silently measure something else.
+    """
+    import streamlit
+
+    version = tuple(int(part) for part in streamlit.__version__.split('.')[:2])
+    tested = [tuple(int(part) for part in v.split('.')) for v in TESTED_STREAMLIT]
+    try:
+        from streamlit.runtime.runtime import Runtime
+        from streamlit.runtime.scriptrunner import script_cache
+        problems = [
+            name for name, ok in (
+                ('ScriptCache.get_bytecode', callable(getattr(script_cache.ScriptCache, 'get_bytecode', None))),
+                ('Runtime.instance (classmethod)', isinstance(inspect.getattr_static(Runtime, 'instance', None), classmethod)),
+                ('Runtime._instance', hasattr(Runtime, '_instance')),
+            ) if not ok
+        ]
+    except ImportError as e:
+        problems = [str(e)]
+    if problems:
+        sys.exit(
+            f'streamlit {streamlit.__version__} lacks the AppTest internals this load test patches to run '
+            f'sessions concurrently ({", ".join(problems)}); tested with {" to ".join(TESTED_STREAMLIT)}. '
+            f'Run with --sessions 1, or update _allow_concurrent_apptests.'
+        )
+    if not tested[0] <= version <= tested[1]:
+        print(f'warning: streamlit {streamlit.__version__} is outside the tested range '
+              f'{" to ".join(TESTED_STREAMLIT)}; concurrent sessions rely on patched internals', file=sys.stderr)
+
+
+def _allow_concurrent_apptests():
+    """Patch the two places where AppTest assumes one test runs at a time.
+
+    Every AppTest run compiles app.py into its own ScriptCache, and concurrent
+    ast.parse calls can fail on CPython 3.11 (SystemError); the server compiles
+    once for all sessions, so compiles are serialized here (reruns are not).
+    Each run also installs a mock Runtime and clears it when it ends, which
+    would pull the runtime from under the other sessions' scripts, so a
+    cleared runtime falls back to the last one installed.
+    """
+    _check_apptest_internals()
+    from streamlit.runtime.runtime import Runtime
+    from streamlit.runtime.scriptrunner import script_cache
+
+    compile_bytecode = script_cache.ScriptCache.get_bytecode
+    compile_lock = threading.Lock()
+
+    def get_bytecode(self, script_path):
+        with compile_lock:
+            return compile_bytecode(self, script_path)
+
+    script_cache.ScriptCache.get_bytecode = get_bytecode
+
+    runtime_instance = Runtime.instance.__func__
+    installed = []
+
+    def instance(cls):
+        if cls._instance is not None:
+            installed[:] = [cls._instance]
+            return cls._instance
+        return installed[0] if installed else runtime_instance(cls)
+
+    Runtime.instance = classmethod(instance)
+
+
+# --- INTERACTIONS ---
+def _pie_categories(at):
+    # Slice labels are "<category> (<share>%)"; the click handler stores the category
+    for chart in at.get('plotly_chart'):
+        spec = json.loads(chart.proto.spec)
+        trace = spec['data'][0]
+        if trace.get('type') == 'pie':
+            return [label.rsplit(' (', 1)[0] for label in trace['labels']]
+    return []
+
+
+def interact(at, action, rng):
+    """Apply one interaction to ``at`` and rerun; returns the action actually run."""
+    select_all = next(w for w in at.checkbox if w.label == 'Select All Units')
+    if action == 'units.multiselect' and select_all.value:
+        # The multiselect only exists once "Select All Units" is unticked
+        action = 'units.select_all'
+    if action == 'units.select_all':
+        select_all.set_value(not select_all.value)
+    elif action == 'units.multiselect':
+        picker = at.multiselect[0]
+        picker.set_value(rng.sample(picker.options, rng.randint(1, min(3, len(picker.options)))))
+    elif action == 'detail.unit':
+        selector = at.selectbox[0]
+        selector.select(rng.choice(selector.options))
+    elif action == 'pie.click':
+        categories = _pie_categories(at)
+        at.session_state['selected_category'] = rng.choice(categories) if categories else None
+    elif action == 'pie.mode':
+        current = at.session_state['pie_mode'] if 'pie_mode' in at.session_state else 'Amount'
+        at.button(key='pie_volume_btn' if current == 'Amount' else 'pie_amount_btn').click()
+    elif action == 'trend.mode':
+        radio = at.radio(key='trend_mode_s2')
+        radio.set_value('Volume' if radio.value == 'Amount' else 'Amount')
+    elif action == 'trend.freq':
+        radio = at.radio(key='trend_freq_s2')
+        radio.set_value(rng.choice(radio.options))
+    else:
+        raise ValueError(f'unknown action {action!r}')
+    at.run()
+    return action
+
+
+def run_session(session_id, steps, think_ms, seed, timeout, start_barrier, reruns, errors):
+    """One simulated user: a page load, then ``steps`` weighted random interactions."""
+    rng = random.Random(seed * 10_007 + session_id)
+    actions, weights = list(ACTION_WEIGHTS), list(ACTION_WEIGHTS.values())
+    at = AppTest.from_file(APP_PATH, default_timeout=timeout)
+    start_barrier.wait()
+
+    def timed(action, fn):
+        # fn returns the action it ran (units.multiselect may become units.select_all)
+        start = time.perf_counter()
+        try:
+            action = fn()
+        except Exception as e:
+            errors.append({'session': session_id, 'action': action, 'error': f'{type(e).__name__}: {e}'})
+            return False
+        reruns.append((action, time.perf_counter() - start))
+        for exc in at.exception:
+            errors.append({'session': session_id, 'action': action, 'error': exc.value})
+        return not at.exception
+
+    if not timed('page.load', lambda: at.run() and 'page.load'):
+        return
+    for _ in range(steps):
+        if think_ms:
+            time.sleep(rng.uniform(0, 2 * think_ms) / 1000)
+        action = rng.choices(actions, weights)[0]
+        if not timed(action, lambda: interact(at, action, rng)):
+            return
+
+
+# --- LEVELS ---
+def _latency_summary(seconds):
+    ms = np.asarray(seconds) * 1000
+    summary = {f'p{p}_ms': float(np.percentile(ms, p)) for p in PERCENTILES}
+    summary.update(mean_ms=float(ms.mean()), max_ms=float(ms.max()), count=len(ms))
+    return summary
+
+
+def run_level(sessions, steps, think_ms, seed, timeout):
+    """Run ``sessions`` concurrent sessions to completion and summarize them."""
+    chart_cache.clear()
+    cache_before = chart_cache.stats()
+    reruns, errors = [], []
+    # The sessions and this thread start the clock together, after every AppTest is built
+    start_barrier = threading.Barrier(sessions + 1)
+    threads = [
+        threading.Thread(target=run_session, name=f'session-{i}',
+                         args=(i, steps, think_ms, seed, timeout, start_barrier, reruns, errors))
+        for i in range(sessions)
+    ]
+    for thread in threads:
+        thread.start()
+    sampler = RssSampler()
+    rss_start = current_rss_mb()
+    sampler.start()
+    start_barrier.wait()
+    start = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - start
+    sampler.stop()
+    cache_after = chart_cache.stats()
+
+    by_action = {}
+    for action, seconds in reruns:
+        by_action.setdefault(action, []).append(seconds)
+    result = {
+        'sessions': sessions,
+        'wall_seconds': wall,
+        'reruns': len(reruns),
+        'reruns_per_second': len(reruns) / wall if wall else 0.0,
+        'errors': len(errors),
+        'error_samples': errors[:5],
+        'rss_start_mb': rss_start,
+        'rss_peak_mb': max(sampler.samples),
+        'rss_end_mb': sampler.samples[-1],
+        'rss_high_water_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        'cache_hits': cache_after['hits'] - cache_before['hits'],
+        'cache_misses': cache_after['misses'] - cache_before['misses'],
+        'latency': _latency_summary([seconds for _, seconds in reruns]) if reruns else None,
+        'by_action': {action: _latency_summary(values) for action, values in sorted(by_action.items())},
+    }
+    return result
+
+
+def print_level(result):
+    latency = result['latency'] or {}
+    print(f"{result['sessions']:>8}{result['reruns']:>8}{result['errors']:>7}"
+          + ''.join(f"{latency.get(f'p{p}_ms', float('nan')):>10.1f}" for p in PERCENTILES)
+          + f"{result['reruns_per_second']:>10.2f}{result['rss_peak_mb']:>10.1f}", flush=True)
+
+
+def print_actions(result):
+    print(f"\nper action at {result['sessions']} sessions")
+    print(f"{'action':<20}{'count':>7}{'p50 ms':>10}{'p95 ms':>10}")
+    for action, summary in result['by_action'].items():
+        print(f"{action:<20}{summary['count']:>7}{summary['p50_ms']:>10.1f}{summary['p95_ms']:>10.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sessions', nargs='+', type=int, default=[1, 2, 4, 8],
+                        help='concurrent session counts to run, one level each')
+    parser.add_argument('--steps', type=int, default=20, help='interactions per session after the page load')
+    parser.add_argument('--think-ms', type=float, default=0.0,
+                        help='mean pause between interactions (default 0: back-to-back)')
+    parser.add_argument('--backend', choices=['pandas', 'duckdb'],
+                        default=os.environ.get('DASHBOARD_BACKEND', 'pandas').lower())
+    parser.add_argument('--data-dir', default=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                        help='directory holding the workbook / store the app reads (default: repo root)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--timeout', type=float, default=300, help='per-rerun AppTest timeout in seconds')
+    parser.add_argument('--out', default=None,
+                        help='results file (default: benchmarks/results/load-<timestamp>-<commit>.json)')
+    args = parser.parse_args()
+
+    # The app reads its data relative to the working directory, and picks the
+    # backend once per process when the dataset is first loaded
+    os.chdir(args.data_dir)
+    os.environ['DASHBOARD_BACKEND'] = args.backend
+    if max(args.sessions) > 1:
+        _allow_concurrent_apptests()
+
+    start = time.perf_counter()
+    warmup = AppTest.from_file(APP_PATH, default_timeout=args.timeout).run()
+    if warmup.exception:
+        sys.exit(f'app failed to load: {warmup.exception[0].value}')
+    warmup_seconds = time.perf_counter() - start
+    print(f'dataset loaded and first page rendered in {warmup_seconds:.1f} s ({args.backend} backend)\n')
+
+    report = {
+        'environment': environment(),
+        'config': {**vars(args), 'action_weights': ACTION_WEIGHTS, 'warmup_seconds': warmup_seconds},
+        'levels': [],
+    }
+    print(f"{'sessions':>8}{'reruns':>8}{'errors':>7}"
+          + ''.join(f"{f'p{p} ms':>10}" for p in PERCENTILES) + f"{'reruns/s':>10}{'RSS MB':>10}")
+    for sessions in args.sessions:
+        result = run_level(sessions, args.steps, args.think_ms, args.seed, args.timeout)
+        report['levels'].append(result)
+        print_level(result)
+    print_actions(report['levels'][-1])
+
+    out = args.out
+    if out is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        stamp = datetime.datetime.now().strftime('%Y%m%d-%H%M%S')
+        out = os.path.join(RESULTS_DIR, f"load-{stamp}-{report['environment']['commit'] or 'nogit'}.json")
+    with open(out, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f'\nresults written to {out}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,238 @@
+"""Time ingestion, export, filtering and every chart aggregation at several scales.
+
+Each scale generates synthetic transactions (see ``synthetic.py``), writes
+them to CSV and runs the pipeline on them. Every step records its best wall
+time and its peak traced allocation (``tracemalloc``: Python, NumPy and
+pandas buffers; Arrow's own memory pool is not included). Results go to
+``benchmarks/results/<timestamp>-<commit>.json``; ``--compare`` prints the
+ratio against an earlier results file.
+
+    python benchmarks/run_benchmarks.py --scales 10k 100k 1m
+    python benchmarks/run_benchmarks.py --compare benchmarks/results/<earlier>.json
+"""
+import argparse
+import datetime
+import gc
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+import pyarrow  # noqa: E402
+
+import aggregations  # noqa: E402
+from cube import build_cube  # noqa: E402
+from data_store import ensure_cache, load_dataset  # noqa: E402
+from indexes import take_units  # noqa: E402
+from prepare_data import build_manifest, export_columnar, export_frame, export_shards  # noqa: E402
+from sketches import build_sketches  # noqa: E402
+from sql_backend import SqlCube, duckdb  # noqa: E402
+from synthetic import write_synthetic  # noqa: E402
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+SCALES = {'10k': 10_000, '100k': 100_000, '1m': 1_000_000, '10m': 10_000_000}
+# Slower by more than this factor is flagged by --compare
+REGRESSION_THRESHOLD = 1.10
+# Charts that approximate mode answers from sketches
+APPROX_CHARTS = ['stats_totals', 'stats_totals.window', 'top_suppliers', 'top_products', 'top_products.category']
+
+
+# --- MEASUREMENT ---
+def measure(fn, repeat=3, memory=True):
+    """Best-of-``repeat`` seconds for ``fn()`` plus one traced run's peak MB."""
+    seconds = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        fn()
+        seconds.append(time.perf_counter() - start)
+    result = {'seconds': min(seconds)}
+    if memory:
+        gc.collect()
+        tracemalloc.start()
+        try:
+            fn()
+            result['peak_mb'] = tracemalloc.get_traced_memory()[1] / 1e6
+        finally:
+            tracemalloc.stop()
+    return result
+
+
+def _cold(fn):
+    # Charts call each other through the LRU (e.g. supplier_trend -> top_suppliers);
+    # clearing it first keeps every measured call a full computation
+    def call():
+        aggregations.chart_cache.clear()
+        return fn()
+    return call
+
+
+def _chart_calls(cube, units, window):
+    # Undecorated functions, so the measured call itself is never a cache hit
+    unit = units[0]
+    start, end = window
+    raw = {name: getattr(aggregations, name).__wrapped__ for name in (
+        'stats_totals', 'period_over_period', 'daily_trend', 'top_suppliers', 'category_split',
+        'top_products', 'supplier_trend',
+    )}
+    category = aggregations.category_split(cube, unit, 'Amount')['category_group'].iloc[0]
+    return {
+        'stats_totals': lambda: raw['stats_totals'](cube, units),
+        'stats_totals.window': lambda: raw['stats_totals'](cube, units, start, end),
+        'period_over_period': lambda: raw['period_over_period'](cube, units, start, end),
+        'daily_trend': lambda: raw['daily_trend'](cube, units),
+        'daily_trend.smoothed': lambda: raw['daily_trend'](cube, units, None, None, 7),
+        'top_suppliers': lambda: raw['top_suppliers'](cube, unit, 4),
+        'category_split': lambda: raw['category_split'](cube, unit, 'Amount'),
+        'top_products': lambda: raw['top_products'](cube, unit, None, 5),
+        'top_products.category': lambda: raw['top_products'](cube, unit, category, 5),
+        'supplier_trend.daily': lambda: raw['supplier_trend'](cube, unit, 'Amount', 4, 'D'),
+        'supplier_trend.weekly': lambda: raw['supplier_trend'](cube, unit, 'Amount', 4, 'W-MON'),
+    }
+
+
+def run_scale(rows, workdir, backends, memory=True, export=True):
+    results = {}
+
+    def record(name, fn, repeat=3):
+        results[name] = measure(fn, repeat, memory)
+        results[name]['rss_high_water_mb'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        print(f"  {name:<44}{results[name]['seconds'] * 1000:>12.1f} ms"
+              f"{results[name].get('peak_mb', float('nan')):>12.1f} MB", flush=True)
+
+    source = os.path.join(workdir, f'synthetic_{rows}.csv')
+    write_synthetic(source, rows)
+    cache_dir = os.path.join(workdir, 'cache')
+
+    def cold_cache():
+        for name in os.listdir(cache_dir) if os.path.isdir(cache_dir) else []:
+            os.remove(os.path.join(cache_dir, name))
+        ensure_cache(source, cache_dir)
+
+    record('ingest.parse_to_parquet', cold_cache, repeat=1)
+    record('ingest.load_cached', lambda: load_dataset(source, cache_dir))
+    df = load_dataset(source, cache_dir)
+    record('cube.build', lambda: build_cube(df), repeat=1)
+    cube = build_cube(df)
+
+    if export:
+        frame = export_frame(df)
+        out = os.path.join(workdir, 'export')
+        os.makedirs(out, exist_ok=True)
+        record('export.columnar', lambda: export_columnar(frame, os.path.join(out, 'data.columnar.json')), repeat=1)
+        shard_names = {unit: 'x' for unit in frame['Quantity unit'].unique()}
+        record('export.manifest', lambda: build_manifest(frame, shard_names), repeat=1)
+        record('export.shards', lambda: export_shards(frame, os.path.join(out, 'data')), repeat=1)
+        del frame
+
+    units = list(df['Quantity unit'].value_counts().index[:2])
+    dates = np.sort(df['Transaction Date'].unique())
+    window = (pd.Timestamp(dates[len(dates) // 3]).date(), pd.Timestamp(dates[2 * len(dates) // 3]).date())
+    record('filter.raw_isin', lambda: df[df['Quantity unit'].isin(units)])
+    record('filter.raw_window', lambda: df[df['Transaction Date'].between(*map(pd.Timestamp, window))])
+    record('filter.cube_units', lambda: take_units(cube['rollups']['base'], cube['unit_index']['base'], units))
+
+    all_units = aggregations.unit_values(cube)
+    handles = {'pandas': cube}
+    if 'duckdb' in backends:
+        handles['duckdb'] = SqlCube([ensure_cache(source, cache_dir)])
+    for backend, handle in handles.items():
+        if backend not in backends:
+            continue
+        for name, fn in _chart_calls(handle, units, window).items():
+            record(f'chart.{backend}.{name}', _cold(fn))
+        record(f'chart.{backend}.stats_totals.all_units',
+               _cold(lambda: aggregations.stats_totals.__wrapped__(handle, all_units)))
+
+    if 'pandas' in backends:
+        record('sketches.build', lambda: build_sketches([df]), repeat=1)
+        record('cube.build.approximate', lambda: build_cube(df, approximate=True), repeat=1)
+        approx = build_cube(df, approximate=True)
+        calls = _chart_calls(approx, units, window)
+        for name in APPROX_CHARTS:
+            record(f'chart.pandas.approx.{name}', _cold(calls[name]))
+    return results
+
+
+# --- RESULTS ---
+def _git(*args):
+    try:
+        return subprocess.run(['git', *args], capture_output=True, text=True, check=True,
+                              cwd=os.path.dirname(RESULTS_DIR)).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def environment():
+    return {
+        'commit': _git('rev-parse', '--short', 'HEAD'),
+        'dirty': bool(_git('status', '--porcelain', '--untracked-files=no')),
+        'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'pyarrow': pyarrow.__version__,
+        'duckdb': duckdb.__version__ if duckdb is not None else None,
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+    }
+
+
+def compare(old, new):
+    """Print new/old time ratios for every metric present in both runs."""
+    print(f"\n{'scale':<8}{'metric':<44}{'old ms':>10}{'new ms':>10}{'ratio':>8}")
+    for scale, metrics in new['results'].items():
+        for name, result in metrics.items():
+            before = old['results'].get(scale, {}).get(name)
+            if before is None:
+                continue
+            ratio = result['seconds'] / before['seconds'] if before['seconds'] else float('inf')
+            flag = '  slower' if ratio > REGRESSION_THRESHOLD else ''
+            print(f"{scale:<8}{name:<44}{before['seconds'] * 1000:>10.1f}{result['seconds'] * 1000:>10.1f}"
+                  f"{ratio:>8.2f}{flag}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scales', nargs='+', default=['10k', '100k', '1m'], choices=list(SCALES))
+    parser.add_argument('--backends', nargs='+', default=['pandas', 'duckdb'], choices=['pandas', 'duckdb'])
+    parser.add_argument('--no-memory', action='store_true', help='skip the traced run (faster)')
+    parser.add_argument('--no-export', action='store_true', help='skip the JSON exports')
+    parser.add_argument('--out', default=None, help='results file (default: benchmarks/results/<timestamp>-<commit>.json)')
+    parser.add_argument('--compare', metavar='JSON', help='earlier results file to compare against')
+    args = parser.parse_args()
+
+    backends = [b for b in args.backends if b != 'duckdb' or duckdb is not None]
+    report = {'environment': environment(), 'results': {}}
+    for scale in args.scales:
+        print(f'{scale} rows', flush=True)
+        with tempfile.TemporaryDirectory(prefix='bench-') as workdir:
+            report['results'][scale] = run_scale(
+                SCALES[scale], workdir, backends, memory=not args.no_memory, export=not args.no_export,
+            )
+
+    out = args.out
+    if out is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        stamp = datetime.datetime.now().strftime('%Y%m%d-%H%M%S')
+        out = os.path.join(RESULTS_DIR, f"{stamp}-{report['environment']['commit'] or 'nogit'}.json")
+    with open(out, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f'\nresults written to {out}')
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), report)
+
+
+if __name__ == '__main__':
+    main()
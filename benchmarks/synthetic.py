@@ -0,0 +1,207 @@
+"""Synthetic transactions with the workbook's schema and cardinalities.
+
+Units, categories and their weights are the workbook's own; suppliers,
+products and the free-text columns are generated with the same counts and a
+comparable skew (a few suppliers carry most rows, each serving one to three
+units). Amounts and quantities are log-normal around the workbook's medians.
+
+    python benchmarks/synthetic.py 1000000 synthetic_1m.csv
+"""
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+# Row counts per unit / category in the workbook (12,132 rows)
+UNIT_WEIGHTS = {
+    'Pieces': 7929, 'Kilograms': 1413, 'Square Meters': 916, 'Unit': 582, 'Set': 563, 'Meters': 288,
+    'Roll': 156, 'Bag': 53, 'Box/Bag/Pack': 47, 'Cubic Meters': 40, 'Liter': 36, 'Barrel': 19,
+    'Bottle/Bottle/Tube': 17, 'Plates': 17, 'Kit': 16, 'Package': 13, 'Plants (UNY)': 6, 'System': 5,
+    'UNC (animals)': 5, 'Yarn': 5, 'Pairs': 2, 'Bar/Pieces (UNT)': 1, 'Block': 1, 'Feet': 1, 'Millimeter': 1,
+}
+CATEGORY_WEIGHTS = {
+    'Giấy, Màng & Vật liệu Đóng gói': 2808, 'Thủy lực, Khí nén & Ống dẫn': 1740,
+    'Điện, Tự động hóa & Cảm biến': 1595, 'Dụng cụ & Vật tư nhà xưởng': 1472,
+    'Bu lông, Đai ốc & Phụ kiện liên kết': 982, 'Dây, Cáp & Phụ kiện điện': 964,
+    'Hóa chất, Mực in & Nguyên liệu': 897, 'Bạc đạn & Truyền động cơ khí': 755, 'Others': 596,
+    'CNTT, Điện tử & Văn phòng': 323,
+}
+# Distinct standardized_name values per category (66 in total)
+PRODUCTS_PER_CATEGORY = [9, 7, 8, 11, 5, 6, 5, 5, 5, 5]
+SUPPLIERS = 144
+# Weekday shares, Monday first; almost nothing is declared on Sundays
+WEEKDAY_WEIGHTS = [1766, 1916, 2377, 2701, 2035, 1294, 43]
+START_DATE = '2024-09-04'
+END_DATE = '2025-10-31'
+
+COLUMNS = [
+    'page', 'stt', 'bill_id', 'Transaction Date', 'Declaration No', 'Type of Import', 'HS Code',
+    'Product Description', 'Product Desc (EN)', 'quantity', 'Quantity unit', 'Currency',
+    'Unit Price(Currency)', 'Total Price(Currency)', 'Exchange Rate', 'Unit Price(USD)', 'Amount', 'Buyer',
+    'Buyer Name(EN)', 'Importer ID', 'Buyer Address(VN)', 'Buyer Tel', 'Supplier', 'Country of Origin',
+    'Exporter Country', 'Exporter Country Name', 'Incoterms', 'Payment Method', 'Mode of Transport',
+    'Bill of Lading ID', 'Import Country', 'cleaned_text', 'product_extracted', 'standardized_name',
+    'category_group', 'confidence_score',
+]
+
+
+def _weights(values):
+    values = np.asarray(values, dtype=np.float64)
+    return values / values.sum()
+
+
+def _zipf(n, s=1.3):
+    return _weights(1.0 / np.arange(1, n + 1) ** s)
+
+
+def _pool(prefix, n):
+    return np.array([f'{prefix} {i:04d}' for i in range(n)], dtype=object)
+
+
+class _Profile:
+    """Fixed pools and per-supplier unit mixes, shared by every chunk of a run."""
+
+    def __init__(self, rng):
+        self.units = np.array(list(UNIT_WEIGHTS), dtype=object)
+        self.categories = np.array(list(CATEGORY_WEIGHTS), dtype=object)
+        self.category_p = _weights(list(CATEGORY_WEIGHTS.values()))
+        self.products = [
+            np.array([f'{category.split(",")[0].split(" &")[0]} item {i:02d}' for i in range(n)], dtype=object)
+            for category, n in zip(self.categories, PRODUCTS_PER_CATEGORY)
+        ]
+        self.suppliers = _pool('Supplier Co. Ltd', SUPPLIERS)
+        self.supplier_p = _zipf(SUPPLIERS)
+        # Each supplier serves one to three units, drawn with the workbook's unit weights
+        unit_p = _weights(list(UNIT_WEIGHTS.values()))
+        self.supplier_units = [
+            rng.choice(len(self.units), size=rng.choice([1, 2, 3], p=[0.55, 0.25, 0.2]), replace=False, p=unit_p)
+            for _ in range(SUPPLIERS)
+        ]
+        # Rare units still need a supplier: hand each uncovered one to a tail supplier
+        covered = set(np.concatenate(self.supplier_units).tolist())
+        for u in range(len(self.units)):
+            if u not in covered:
+                s = rng.integers(SUPPLIERS // 2, SUPPLIERS)
+                self.supplier_units[s] = np.append(self.supplier_units[s], u)
+        days = pd.date_range(START_DATE, END_DATE, freq='D')
+        self.days = days.to_numpy()
+        self.day_p = _weights(np.asarray(WEEKDAY_WEIGHTS)[days.dayofweek])
+        self.descriptions = _pool('Imported spare part, description', 8000)
+        self.extracted = _pool('extracted product', 4000)
+        self.hs_codes = rng.integers(10_000_000, 99_999_999, size=710)
+        self.currencies = np.array(['VND', 'USD', 'EUR', 'JPY', 'CNY', 'SEK', 'CHF', 'GBP', 'SGD', 'KRW'], dtype=object)
+        self.rates = np.array([1.0, 1.0, 1.08, 0.0067, 0.14, 0.095, 1.13, 1.27, 0.74, 0.00073])
+        self.countries = _pool('Country', 49)
+
+
+def _take(rng, pool, size, p=None):
+    return pool[rng.choice(len(pool), size=size, p=p)]
+
+
+def _chunk(profile, rng, first_row, rows):
+    idx = np.arange(first_row, first_row + rows)
+    supplier = rng.choice(SUPPLIERS, size=rows, p=profile.supplier_p)
+    # A row's unit is one of its supplier's units
+    pick = rng.random(rows)
+    unit = np.empty(rows, dtype=np.int64)
+    for s in np.unique(supplier):
+        mask = supplier == s
+        units = profile.supplier_units[s]
+        unit[mask] = units[(pick[mask] * len(units)).astype(np.int64)]
+    category = rng.choice(len(profile.categories), size=rows, p=profile.category_p)
+    product = np.empty(rows, dtype=object)
+    for c, names in enumerate(profile.products):
+        mask = category == c
+        product[mask] = names[rng.choice(len(names), size=int(mask.sum()), p=_zipf(len(names), 1.1))]
+
+    quantity = np.round(rng.lognormal(np.log(8), 3.0, rows), 2) + 0.3
+    amount = np.round(rng.lognormal(np.log(1000), 2.3, rows), 4)
+    currency = rng.choice(len(profile.currencies), size=rows, p=_weights([80, 12, 3, 1, 1, 1, 0.5, 0.5, 0.5, 0.5]))
+    rate = profile.rates[currency]
+    bill_id = -(800_000_000 + idx)
+    description = _take(rng, profile.descriptions, rows)
+
+    frame = pd.DataFrame({
+        'page': idx // 25 + 1,
+        'stt': idx % 20 + 1,
+        'bill_id': bill_id,
+        'Transaction Date': rng.choice(profile.days, size=rows, p=profile.day_p),
+        'Declaration No': 107_000_000_000 + idx // 3,
+        'Type of Import': _take(rng, _pool('Import type', 10), rows),
+        'HS Code': _take(rng, profile.hs_codes, rows),
+        'Product Description': description,
+        'Product Desc (EN)': description,
+        'quantity': quantity,
+        'Quantity unit': profile.units[unit],
+        'Currency': profile.currencies[currency],
+        'Unit Price(Currency)': np.round(amount / rate / quantity, 4),
+        'Total Price(Currency)': np.round(amount / rate, 2),
+        'Exchange Rate': rate,
+        'Unit Price(USD)': np.round(amount / quantity, 5),
+        'Amount': amount,
+        'Buyer': 'công ty cổ phần tetra pak bình dương',
+        'Buyer Name(EN)': 'TETRA PAK BINH DUONG JOINT STOCK COMPANY',
+        'Importer ID': 3702529978,
+        'Buyer Address(VN)': 'Số 12 VSIP II-A, Đường số 30, KCN Việt Nam - Singapore II-A',
+        'Buyer Tel': _take(rng, np.array([str(2746251439 + i) for i in range(9)], dtype=object), rows),
+        'Supplier': profile.suppliers[supplier],
+        'Country of Origin': _take(rng, profile.countries, rows),
+        'Exporter Country': _take(rng, profile.countries[:40], rows),
+        'Exporter Country Name': _take(rng, profile.countries[:44], rows),
+        'Incoterms': _take(rng, np.array(['DAP', 'CIF', 'FOB', 'EXW', 'FCA', 'CIP', 'DDP', 'CFR', 'CPT', 'DDU'], dtype=object), rows),
+        'Payment Method': _take(rng, np.array(['KC', 'TTR', 'LC'], dtype=object), rows),
+        'Mode of Transport': _take(rng, np.array(['OTHER', 'SEA', 'AIR', 'ROAD', 'RAIL', 'POST', 'MULTI'], dtype=object), rows),
+        'Bill of Lading ID': -bill_id,
+        'Import Country': 'Vietnam',
+        'cleaned_text': description,
+        'product_extracted': _take(rng, profile.extracted, rows),
+        'standardized_name': product,
+        'category_group': profile.categories[category],
+        'confidence_score': np.round(rng.uniform(0.6, 1.0, rows), 3),
+    })
+    return frame[COLUMNS]
+
+
+# --- PUBLIC API ---
+def iter_synthetic(rows, seed=0, chunk_rows=250_000):
+    """Yield ``rows`` synthetic transactions in frames of at most ``chunk_rows``."""
+    rng = np.random.default_rng(seed)
+    profile = _Profile(rng)
+    for first_row in range(0, rows, chunk_rows):
+        yield _chunk(profile, rng, first_row, min(chunk_rows, rows - first_row))
+
+
+def synthetic_frame(rows, seed=0):
+    """``rows`` synthetic transactions as one raw (un-normalized) frame."""
+    return pd.concat(iter_synthetic(rows, seed), ignore_index=True)
+
+
+def write_synthetic(path, rows, seed=0):
+    """Write synthetic transactions to .csv (streamed), .parquet or .xlsx."""
+    if path.lower().endswith('.csv'):
+        for i, chunk in enumerate(iter_synthetic(rows, seed)):
+            chunk.to_csv(path, mode='w' if i == 0 else 'a', header=i == 0, index=False)
+    elif path.lower().endswith('.parquet'):
+        synthetic_frame(rows, seed).to_parquet(path, index=False)
+    elif path.lower().endswith('.xlsx'):
+        if rows >= 1_048_576:
+            raise ValueError('an Excel sheet holds at most 1,048,575 data rows; use .csv')
+        synthetic_frame(rows, seed).to_excel(path, index=False)
+    else:
+        raise ValueError(f'unsupported extension: {os.path.splitext(path)[1]!r}')
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate synthetic transactions with the workbook schema.')
+    parser.add_argument('rows', type=int)
+    parser.add_argument('path', help='.csv, .parquet or .xlsx')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    write_synthetic(args.path, args.rows, args.seed)
+    print(f'{args.rows:,} rows written to {args.path}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,304 @@
+import numpy as np
+import pandas as pd
+
+from indexes import (
+    build_bitsets, build_date_prefix, build_unit_index, count_distinct, date_bounds, range_totals,
+    take_units,
+)
+import sketches
+
+UNIT = 'Quantity unit'
+DATE = 'Transaction Date'
+SUPPLIER = 'Supplier'
+CATEGORY = 'category_group'
+PRODUCT = 'standardized_name'
+
+MEASURES = ['Amount', 'quantity', 'rows']
+
+BASE_GRAIN = [UNIT, DATE, SUPPLIER, CATEGORY, PRODUCT]
+
+# Coarser roll-ups, one per dashboard access pattern. Every roll-up leads with
+# the unit so both sections can slice it by unit selection.
+ROLLUPS = {
+    'unit_date': [UNIT, DATE],
+    'unit_supplier': [UNIT, SUPPLIER],
+    'unit_category': [UNIT, CATEGORY],
+    'unit_category_product': [UNIT, CATEGORY, PRODUCT],
+    'unit_category_supplier': [UNIT, CATEGORY, SUPPLIER],
+    'unit_supplier_date': [UNIT, SUPPLIER, DATE],
+}
+
+# Dimensions with per-unit membership bitsets for exact distinct counts
+DISTINCT_DIMS = [SUPPLIER, CATEGORY, PRODUCT]
+
+# Ranked dimensions in the top-K index, keyed by (unit, category or ALL)
+TOPK_DIMS = [SUPPLIER, PRODUCT]
+TOPK_DEPTH = 10
+ALL = 'All'
+
+
+def build_cube(df, approximate=False):
+    """Pre-aggregate Amount/quantity/row counts at the base grain plus roll-ups.
+
+    Returns ``{'rollups': {name: DataFrame}, 'unit_index': {name: ranges},
+    'distinct': {dim: bitsets}, 'date_prefix': {unit: prefix sums},
+    'topk': {dim: {(unit, category): ranked}}, 'sketches': ...}``. Roll-ups
+    are derived from the base grain rather than the raw rows, so building
+    them costs one scan of the transactions. Each roll-up is sorted
+    unit-first and carries a unit -> row-range index for slicing.
+    ``approximate`` builds the sketches in ``sketches.py`` from the rows
+    instead of the exact bitsets and top-K index they replace (``'distinct'``
+    and ``'topk'`` are then None); otherwise ``'sketches'`` is None.
+    """
+    rollups = _aggregate(df)
+    if approximate:
+        cube = _assemble(rollups, None, exact=False)
+        cube['sketches'] = sketches.build_sketches([df])
+        return cube
+    return _assemble(rollups, build_topk(rollups))
+
+
+def _aggregate(df):
+    base = (
+        df.groupby(BASE_GRAIN, observed=True)
+        .agg(Amount=('Amount', 'sum'), quantity=('quantity', 'sum'), rows=('Amount', 'size'))
+        .reset_index()
+    )
+    rollups = {'base': base}
+    for name, dims in ROLLUPS.items():
+        rollups[name] = base.groupby(dims, observed=True)[MEASURES].sum().reset_index()
+    return rollups
+
+
+def _assemble(rollups, topk, exact=True):
+    unit_index = {name: build_unit_index(frame) for name, frame in rollups.items()}
+    return {
+        'rollups': rollups,
+        'unit_index': unit_index,
+        'distinct': {dim: build_bitsets(rollups['base'], dim) for dim in DISTINCT_DIMS} if exact else None,
+        'date_prefix': build_date_prefix(rollups['unit_date'], unit_index['unit_date'], MEASURES),
+        'topk': topk,
+        'sketches': None,
+        'token': object(),
+    }
+
+
+# --- INCREMENTAL UPDATE ---
+def _union_categories(old, new, dims):
+    # Both sides must share sorted categories before their rows can be merged
+    old, new = old.copy(), new.copy()
+    for dim in dims:
+        if not isinstance(old[dim].dtype, pd.CategoricalDtype):
+            continue
+        dtype = pd.CategoricalDtype(sorted(set(old[dim].cat.categories) | set(new[dim].cat.categories)))
+        old[dim] = old[dim].astype(dtype)
+        new[dim] = new[dim].astype(dtype)
+    return old, new
+
+
+def update_cube(cube, new_rows):
+    """Return a cube that also covers ``new_rows``, leaving ``cube`` untouched.
+
+    Only the blocks of units present in ``new_rows`` are re-aggregated: each
+    becomes the old block plus the new rows' roll-up, summed again at the
+    roll-up's grain. Blocks of other units are carried over as they are. The
+    unit ranges, bitsets and prefix sums are rebuilt from the roll-ups, and
+    the top-K index is re-ranked for the touched (unit, category) pairs only.
+    Sketches, when the cube has them, merge ``new_rows`` in instead.
+    """
+    delta = _aggregate(new_rows)
+    units = sorted(set(new_rows[UNIT].unique()))
+    rollups = {}
+    for name, frame in cube['rollups'].items():
+        dims = _dims(name)
+        old, new = _union_categories(frame, delta[name], dims)
+        touched = take_units(old, cube['unit_index'][name], units)
+        merged = pd.concat([touched, new]).groupby(dims, observed=True)[MEASURES].sum().reset_index()
+        kept = old[~old[UNIT].isin(units)]
+        rollups[name] = (
+            pd.concat([kept, merged], ignore_index=True)
+            .sort_values(UNIT, kind='stable')
+            .reset_index(drop=True)
+        )
+    if cube['sketches'] is not None:
+        updated = _assemble(rollups, None, exact=False)
+        updated['sketches'] = sketches.update_sketches(cube['sketches'], new_rows)
+        return updated
+    updated = _assemble(rollups, {dim: dict(entries) for dim, entries in cube['topk'].items()})
+    update_topk(updated, new_rows)
+    return updated
+
+
+def _dims(name):
+    return BASE_GRAIN if name == 'base' else ROLLUPS[name]
+
+
+def smallest_rollup(cube, dims):
+    """Name of the smallest roll-up that carries every dimension in ``dims``."""
+    rollups = cube['rollups']
+    candidates = [name for name in rollups if set(dims) <= set(_dims(name))]
+    return min(candidates, key=lambda name: len(rollups[name]))
+
+
+def query(cube, by, units, category=None):
+    """Sum the measures grouped by ``by`` for the given unit(s).
+
+    ``units`` is a single unit or a list of units. ``category`` optionally
+    restricts to one category_group. Answered from the smallest matching
+    roll-up, never from the raw transactions.
+    """
+    needed = [UNIT, *by] + ([CATEGORY] if category is not None else [])
+    rollup = _take(cube, smallest_rollup(cube, needed), units)
+    if category is not None:
+        rollup = rollup[rollup[CATEGORY] == category]
+    if not by:
+        return rollup[MEASURES].sum()
+    return rollup.groupby(by, observed=True)[MEASURES].sum().reset_index()
+
+
+def distinct_count(cube, dim, units):
+    """Exact number of distinct ``dim`` values across the given units.
+
+    A union-and-popcount over the unit bitsets; no rows are touched.
+    """
+    return count_distinct(cube['distinct'][dim], units)
+
+
+def _take(cube, name, units):
+    return take_units(cube['rollups'][name], cube['unit_index'][name], units)
+
+
+def unit_values(cube):
+    """Every Quantity unit in the cube, sorted."""
+    return sorted(cube['unit_index']['unit_date'])
+
+
+# --- DATE WINDOWS ---
+def date_span(cube):
+    """First and last transaction date in the cube, as ``datetime.date``."""
+    dates = cube['rollups']['unit_date'][DATE]
+    return dates.min().date(), dates.max().date()
+
+
+def window_totals(cube, units, start=None, end=None):
+    """Measure totals for the unit(s) within [start, end] from prefix sums."""
+    totals = range_totals(cube['date_prefix'], units, start, end)
+    return {m: totals.get(m, 0.0) for m in MEASURES}
+
+
+def window_rows(cube, units, start=None, end=None):
+    """``unit_date`` roll-up rows for the unit(s) within [start, end].
+
+    Each unit's window is located by binary search in its date-sorted block.
+    """
+    if isinstance(units, str):
+        units = [units]
+    prefix = cube['date_prefix']
+    positions = []
+    for unit in sorted(set(units) & set(prefix)):
+        lo, hi = date_bounds(prefix[unit]['dates'], start, end)
+        offset = prefix[unit]['offset']
+        positions.append(np.arange(offset + lo, offset + hi))
+    rollup = cube['rollups']['unit_date']
+    if not positions:
+        return rollup.iloc[0:0]
+    return rollup.iloc[np.concatenate(positions)]
+
+
+def window_distinct_count(cube, dim, units, start=None, end=None):
+    """Exact distinct ``dim`` count for the unit(s) within [start, end]."""
+    if start is None and end is None:
+        return distinct_count(cube, dim, units)
+    rollup = _take(cube, smallest_rollup(cube, [UNIT, dim, DATE]), units)
+    dates = rollup[DATE]
+    mask = np.ones(len(rollup), dtype=bool)
+    if start is not None:
+        mask &= (dates >= np.datetime64(start, 'ns')).to_numpy()
+    if end is not None:
+        mask &= (dates <= np.datetime64(end, 'ns')).to_numpy()
+    return rollup.loc[mask, dim].nunique()
+
+
+# --- TOP-K INDEX ---
+def _rank_groups(frame, group_cols, dim, depth):
+    # A stable sort keeps the roll-up's name order among equal Amounts, the
+    # same tie-break nlargest() applies to a sorted groupby result
+    ranked = frame.sort_values('Amount', ascending=False, kind='stable')
+    ranked = ranked[ranked.groupby(group_cols, observed=True).cumcount() < depth]
+    return {
+        key: group[[dim, *MEASURES]].reset_index(drop=True)
+        for key, group in ranked.groupby(group_cols, observed=True, sort=False)
+    }
+
+
+def build_topk(rollups, depth=TOPK_DEPTH, units=None):
+    """Ranked suppliers/products per (unit, category) and per (unit, ALL).
+
+    Each entry holds the top ``depth`` rows by Amount with their Amount,
+    quantity and row sums. ``units`` restricts the build to those units,
+    which is how ``update_topk`` re-ranks only what a refresh touched.
+    """
+    topk = {}
+    for dim in TOPK_DIMS:
+        by_category = rollups[smallest_rollup({'rollups': rollups}, [UNIT, CATEGORY, dim])]
+        if units is not None:
+            by_category = by_category[by_category[UNIT].isin(units)]
+        by_unit = by_category.groupby([UNIT, dim], observed=True)[MEASURES].sum().reset_index()
+
+        entries = _rank_groups(by_category, [UNIT, CATEGORY], dim, depth)
+        for (unit,), ranked in _rank_groups(by_unit, [UNIT], dim, depth).items():
+            entries[(unit, ALL)] = ranked
+        topk[dim] = entries
+    return topk
+
+
+def update_topk(cube, changed_rows, depth=TOPK_DEPTH):
+    """Re-rank only the (unit, category) entries touched by ``changed_rows``.
+
+    ``cube`` must already hold the refreshed roll-ups. Every category of a
+    touched unit keeps its entry unless that category itself changed; the
+    unit's ALL entry is always re-ranked.
+    """
+    touched_units = set(changed_rows[UNIT].unique())
+    touched = {(u, c) for u, c in zip(changed_rows[UNIT], changed_rows[CATEGORY])}
+    touched |= {(u, ALL) for u in touched_units}
+    fresh = build_topk(cube['rollups'], depth, units=touched_units)
+    for dim, entries in fresh.items():
+        current = cube['topk'][dim]
+        for key in touched:
+            if key in entries:
+                current[key] = entries[key]
+            else:
+                current.pop(key, None)
+    return cube['topk']
+
+
+def top_ranked(cube, dim, unit, category=None, n=TOPK_DEPTH):
+    """Top ``n`` values of ``dim`` by Amount for a unit (and category), as a lookup."""
+    key = (unit, ALL if category is None else category)
+    if n <= TOPK_DEPTH:
+        ranked = cube['topk'][dim].get(key)
+        if ranked is None:
+            return pd.DataFrame(columns=[dim, *MEASURES])
+        return ranked.head(n)
+    return query(cube, [dim], unit, category=category).nlargest(n, 'Amount')
+
+
+# --- APPROXIMATE MODE ---
+def approximation(cube):
+    """Sketch settings and error bounds when the cube has sketches, else None."""
+    return None if cube['sketches'] is None else sketches.sketch_info(cube['sketches'])
+
+
+def approx_distinct_count(cube, dim, units, start=None, end=None):
+    """HyperLogLog estimate of the distinct ``dim`` count and its ~95% half-width."""
+    estimate = sketches.distinct_count(cube['sketches'], dim, units, start, end)
+    return estimate, sketches.distinct_error(cube['sketches'], estimate)
+
+
+def approx_top_ranked(cube, dim, unit, category=None, n=TOPK_DEPTH, start=None, end=None):
+    """Top ``n`` values of ``dim`` from the merged heavy-hitter summaries.
+
+    Same columns as ``top_ranked`` plus ``amount_bound`` (see ``sketches.top_ranked``).
+    """
+    return sketches.top_ranked(cube['sketches'], dim, unit, category, n, start, end)
@@ -0,0 +1,422 @@
+import datetime
+import hashlib
+import itertools
+import json
+import os
+
+import openpyxl
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+SOURCE_FILE = 'tetra_pak_final_data_finish.xlsx'
+CACHE_DIR = '.cache'
+CACHE_FORMAT_VERSION = 4
+STORE_DIR = 'store'
+STORE_FORMAT_VERSION = 1
+
+# bill_id is unique per transaction line in the customs extracts
+TRANSACTION_KEY = 'bill_id'
+
+DIMENSION_COLUMNS = ['Quantity unit', 'category_group', 'standardized_name', 'Supplier']
+REQUIRED_COLUMNS = ['Transaction Date', 'Amount', 'quantity', *DIMENSION_COLUMNS]
+
+# Rows parsed, normalized and written per step while ingesting. Peak memory
+# during ingestion is roughly one batch, whatever the size of the input.
+INGEST_BATCH_ROWS = int(os.environ.get('INGEST_BATCH_ROWS', 50_000))
+
+
+class MissingColumnsError(ValueError):
+    """A source file or sheet lacks one of ``REQUIRED_COLUMNS``."""
+
+
+# --- NORMALIZATION ---
+def normalize_transactions(df):
+    """Apply the dashboard's type coercions to a raw transactions frame."""
+    return encode_dimensions(coerce_transactions(df))
+
+
+def coerce_transactions(df):
+    """Type coercions only; dimensions stay strings so batches can be concatenated."""
+    df['Transaction Date'] = pd.to_datetime(df['Transaction Date'], errors='coerce')
+    df = df.dropna(subset=['Transaction Date'])
+    df['Amount'] = pd.to_numeric(df['Amount'], errors='coerce').fillna(0)
+    df['quantity'] = pd.to_numeric(df['quantity'], errors='coerce').fillna(0)
+    df['Quantity unit'] = df['Quantity unit'].astype(str).str.strip().fillna('Unknown')
+    df['category_group'] = df['category_group'].astype(str).fillna('Unknown')
+    df['standardized_name'] = df['standardized_name'].astype(str).fillna('Unknown')
+    df['Supplier'] = df['Supplier'].astype(str).fillna('Unknown')
+    return df
+
+
+def encode_dimensions(df):
+    """Dictionary-encode the dimension columns as categoricals.
+
+    Categories are sorted, so a given set of values always maps to the same
+    integer codes. ``isin``/``==``/``groupby`` on these columns then compare
+    codes instead of strings.
+    """
+    for col in DIMENSION_COLUMNS:
+        if col in df:
+            df[col] = df[col].astype(pd.CategoricalDtype(sorted(df[col].unique())))
+    return df
+
+
+# --- STREAMING READERS ---
+def iter_raw_batches(path, batch_rows=INGEST_BATCH_ROWS, sheet=None):
+    """Yield the rows of an Excel or CSV file as frames of at most ``batch_rows``.
+
+    Workbooks are opened with openpyxl in read-only mode, which parses the
+    sheet XML as rows are requested instead of loading the whole workbook.
+    ``sheet`` names the worksheet to read; the active one by default.
+    """
+    if path.lower().endswith('.csv'):
+        # Read as text: a chunk's inferred types need not hold for the next
+        yield from pd.read_csv(path, chunksize=batch_rows, dtype=str)
+        return
+    workbook = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        worksheet = workbook.active if sheet is None else workbook[sheet]
+        rows = worksheet.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        columns = [f'Unnamed: {i}' if name is None else name for i, name in enumerate(header)]
+        while True:
+            chunk = list(itertools.islice(rows, batch_rows))
+            if not chunk:
+                return
+            # object keeps the cell values as parsed (no int -> float upcasts)
+            yield pd.DataFrame(chunk, columns=columns, dtype=object)
+    finally:
+        workbook.close()
+
+
+def iter_transaction_batches(path, batch_rows=INGEST_BATCH_ROWS, sheet=None):
+    """Coerced, non-empty batches of a source file; dimensions are left as strings.
+
+    Raises MissingColumnsError when the file lacks one of ``REQUIRED_COLUMNS``.
+    """
+    for raw in iter_raw_batches(path, batch_rows, sheet):
+        missing = [col for col in REQUIRED_COLUMNS if col not in raw]
+        if missing:
+            raise MissingColumnsError(f'{path}: missing columns {missing}')
+        batch = _other_columns_as_text(coerce_transactions(raw).reset_index(drop=True))
+        if len(batch):
+            yield batch
+
+
+def _other_columns_as_text(batch):
+    # Only REQUIRED_COLUMNS have a type the dashboard relies on. The rest are
+    # kept as text, the one type every batch of a column can be written as
+    text = {
+        col: batch[col].map(str, na_action='ignore').astype(object)
+        for col in batch.columns.difference(REQUIRED_COLUMNS)
+        if not pd.api.types.is_string_dtype(batch[col])
+    }
+    return batch.assign(**text) if text else batch
+
+
+def _arrow_table(batch, schema=None):
+    # The first batch fixes the schema: REQUIRED_COLUMNS keep their coerced
+    # types, every other column is a string, even when empty in that batch
+    batch = _other_columns_as_text(batch)
+    if schema is None:
+        table = pa.Table.from_pandas(batch, preserve_index=False)
+        schema = pa.schema([
+            field if field.name in REQUIRED_COLUMNS else field.with_type(pa.string()) for field in table.schema
+        ], metadata=table.schema.metadata)
+        return table.cast(schema)
+    return pa.Table.from_pandas(batch, schema=schema, preserve_index=False)
+
+
+class _ParquetSink:
+    """Incremental Parquet writer: one row group per written batch."""
+
+    def __init__(self, path):
+        self.path = path
+        self.rows = 0
+        self._writer = None
+
+    def write(self, batch):
+        table = _arrow_table(batch, self._writer.schema if self._writer else None)
+        if self._writer is None:
+            self._writer = pq.ParquetWriter(self.path, table.schema)
+        self._writer.write_table(table)
+        self.rows += len(batch)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+        else:
+            pd.DataFrame().to_parquet(self.path, index=False)
+
+
+def stream_to_parquet(batches, path):
+    """Write frames to one Parquet file as they arrive; returns the row count."""
+    sink = _ParquetSink(path)
+    try:
+        for batch in batches:
+            sink.write(batch)
+    finally:
+        sink.close()
+    return sink.rows
+
+
+# --- SOURCE FINGERPRINT ---
+def file_sha256(path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _cache_paths(source_path, cache_dir):
+    stem = os.path.splitext(os.path.basename(source_path))[0]
+    return (
+        os.path.join(cache_dir, f'{stem}.parquet'),
+        os.path.join(cache_dir, f'{stem}.meta.json'),
+    )
+
+
+def _read_meta(meta_path):
+    try:
+        with open(meta_path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_atomic(path, write):
+    tmp_path = f'{path}.tmp'
+    write(tmp_path)
+    os.replace(tmp_path, path)
+
+
+# --- COLUMNAR CACHE ---
+def _read_cache(parquet_path):
+    # Dimensions are stored as strings and encoded once the whole file is read
+    return encode_dimensions(pd.read_parquet(parquet_path))
+
+
+def ensure_cache(source_path=SOURCE_FILE, cache_dir=CACHE_DIR, batch_rows=INGEST_BATCH_ROWS):
+    """Bring the Parquet cache of ``source_path`` up to date; returns its path.
+
+    The cache is keyed on the workbook's mtime/size and SHA-256. A matching
+    mtime/size skips hashing entirely; a touched-but-identical workbook is
+    recognised by its hash and only refreshes the metadata. Anything else
+    re-parses the workbook once and rewrites the cache.
+
+    Parsing streams the workbook into the cache ``batch_rows`` rows at a
+    time, so memory while parsing does not grow with the workbook.
+    """
+    stat = os.stat(source_path)
+    parquet_path, meta_path = _cache_paths(source_path, cache_dir)
+    meta = _read_meta(meta_path)
+    cache_ok = (
+        meta is not None
+        and meta.get('format') == CACHE_FORMAT_VERSION
+        and os.path.exists(parquet_path)
+    )
+
+    if cache_ok and meta['mtime_ns'] == stat.st_mtime_ns and meta['size'] == stat.st_size:
+        return parquet_path
+
+    sha256 = file_sha256(source_path)
+    if not (cache_ok and meta['sha256'] == sha256):
+        os.makedirs(cache_dir, exist_ok=True)
+        _write_atomic(parquet_path, lambda p: stream_to_parquet(iter_transaction_batches(source_path, batch_rows), p))
+
+    new_meta = {
+        'format': CACHE_FORMAT_VERSION,
+        'source': os.path.abspath(source_path),
+        'sha256': sha256,
+        'mtime_ns': stat.st_mtime_ns,
+        'size': stat.st_size,
+        'rows': pq.ParquetFile(parquet_path).metadata.num_rows,
+    }
+    _write_atomic(meta_path, lambda p: _dump_json(new_meta, p))
+    return parquet_path
+
+
+def load_dataset(source_path=SOURCE_FILE, cache_dir=CACHE_DIR, batch_rows=INGEST_BATCH_ROWS):
+    """Return the normalized transactions, served from the Parquet cache."""
+    return _read_cache(ensure_cache(source_path, cache_dir, batch_rows))
+
+
+def parquet_sources(source_path=SOURCE_FILE, cache_dir=CACHE_DIR, store_dir=STORE_DIR, batches=None):
+    """Parquet files holding the dataset: the store's partitions, or the workbook cache.
+
+    ``batches`` limits the store's partitions to those batch ids.
+    """
+    manifest = read_store_manifest(store_dir)
+    if manifest is not None:
+        return _partition_files(store_dir, manifest, batches=batches)
+    return [ensure_cache(source_path, cache_dir)]
+
+
+def _dump_json(obj, path):
+    with open(path, 'w') as f:
+        json.dump(obj, f, indent=2)
+
+
+# --- SHARED READ-ONLY DATASET ---
+def enable_copy_on_write():
+    # Always on from pandas 3.0, where the option is deprecated
+    if int(pd.__version__.split('.')[0]) < 3:
+        pd.set_option('mode.copy_on_write', True)
+
+
+def load_shared_dataset(source_path=SOURCE_FILE, cache_dir=CACHE_DIR, store_dir=STORE_DIR, batches=None):
+    """Load the dataset for sharing across sessions without copying.
+
+    Reads the append-only store when one exists (only ``batches``, when
+    given), the workbook otherwise.
+
+    Meant to be wrapped in ``st.cache_resource`` so every session and rerun
+    receives the same object instead of an unpickled copy. Copy-on-Write is
+    switched on first, which guarantees that filters, column selections and
+    groupbys taken from the shared frame are lazy views: writing to one of
+    them copies it and never reaches the shared frame. Callers must still
+    never assign into the returned frame itself.
+    """
+    enable_copy_on_write()
+    if read_store_manifest(store_dir) is not None:
+        return read_store(store_dir, batches=batches)
+    return load_dataset(source_path, cache_dir)
+
+
+# --- APPEND-ONLY PARTITIONED STORE ---
+# store/manifest.json lists every appended batch; each batch writes one
+# Parquet file per month it touches under store/<YYYY-MM>/.
+def _store_manifest_path(store_dir):
+    return os.path.join(store_dir, 'manifest.json')
+
+
+def read_store_manifest(store_dir=STORE_DIR):
+    """The store manifest, or None when no store has been created yet."""
+    manifest = _read_meta(_store_manifest_path(store_dir))
+    if manifest is None or manifest.get('format') != STORE_FORMAT_VERSION:
+        return None
+    return manifest
+
+
+def store_version(store_dir=STORE_DIR):
+    """Id of the last appended batch (0 for an empty store, None without one)."""
+    manifest = read_store_manifest(store_dir)
+    if manifest is None:
+        return None
+    return manifest['batches'][-1]['id'] if manifest['batches'] else 0
+
+
+def _partition_files(store_dir, manifest, months=None, batches=None):
+    paths = []
+    for batch in manifest['batches']:
+        if batches is not None and batch['id'] not in batches:
+            continue
+        for partition in batch['partitions']:
+            if months is None or partition.split('/')[0] in months:
+                paths.append(os.path.join(store_dir, partition))
+    return paths
+
+
+def _existing_keys(store_dir, manifest, month):
+    # Duplicates share a transaction date, so only the month being written
+    # to needs checking
+    paths = _partition_files(store_dir, manifest, months={month})
+    # As text, like incoming batches; stores from before keys were kept as
+    # text hold integers
+    return set().union(*(pd.read_parquet(p, columns=[TRANSACTION_KEY])[TRANSACTION_KEY].astype(str) for p in paths))
+
+
+def append_to_store(batches, source, store_dir=STORE_DIR, sheet=None):
+    """Append the rows of coerced ``batches`` that are not already in the store.
+
+    Callers creating the store should ``seed_store`` it first.
+
+    Rows are de-duplicated on ``TRANSACTION_KEY`` against the store and
+    against earlier rows of the same source. Each batch is streamed into
+    its month partitions as it arrives, so memory holds one batch plus the
+    keys of the months touched. Returns the new manifest entry, or None
+    when nothing was new.
+    """
+    manifest = read_store_manifest(store_dir) or {'format': STORE_FORMAT_VERSION, 'batches': []}
+    batch_id = (manifest['batches'][-1]['id'] if manifest['batches'] else 0) + 1
+    known, sinks, units = {}, {}, set()
+    try:
+        for batch in batches:
+            months = batch['Transaction Date'].dt.strftime('%Y-%m')
+            for month, part in batch.groupby(months, sort=True):
+                if month not in known:
+                    known[month] = _existing_keys(store_dir, manifest, month)
+                part = part[~part[TRANSACTION_KEY].isin(known[month]) & ~part[TRANSACTION_KEY].duplicated()]
+                if part.empty:
+                    continue
+                known[month].update(part[TRANSACTION_KEY])
+                units.update(part['Quantity unit'].unique())
+                if month not in sinks:
+                    os.makedirs(os.path.join(store_dir, month), exist_ok=True)
+                    sinks[month] = _ParquetSink(os.path.join(store_dir, f'{month}/batch-{batch_id:05d}.parquet.tmp'))
+                sinks[month].write(part.reset_index(drop=True))
+    finally:
+        for sink in sinks.values():
+            sink.close()
+    if not sinks:
+        return None
+
+    partitions = []
+    for month, sink in sorted(sinks.items()):
+        os.replace(sink.path, sink.path[:-len('.tmp')])
+        partitions.append(f'{month}/batch-{batch_id:05d}.parquet')
+    entry = {
+        'id': batch_id,
+        'source': os.path.abspath(source),
+        **({'sheet': sheet} if sheet is not None else {}),
+        'rows': sum(sink.rows for sink in sinks.values()),
+        'units': sorted(units),
+        'months': sorted(sinks),
+        'partitions': partitions,
+        'appended_at': datetime.datetime.now().isoformat(timespec='seconds'),
+    }
+    manifest['batches'].append(entry)
+    # The manifest is written last: a batch is only visible once complete
+    _write_atomic(_store_manifest_path(store_dir), lambda p: _dump_json(manifest, p))
+    return entry
+
+
+def seed_store(source_path=SOURCE_FILE, cache_dir=CACHE_DIR, store_dir=STORE_DIR, batch_rows=INGEST_BATCH_ROWS):
+    """Create the store with the workbook's rows as its first batch.
+
+    Once a store exists it replaces the workbook as the dataset, so it has
+    to start from the workbook's history rather than from the first
+    appended extract. Rows are streamed from the Parquet cache. Returns the
+    seed batch's manifest entry, or None when a store already exists or
+    there is no workbook to seed from.
+    """
+    if read_store_manifest(store_dir) is not None or not os.path.exists(source_path):
+        return None
+    parquet_file = pq.ParquetFile(ensure_cache(source_path, cache_dir, batch_rows))
+    batches = (record_batch.to_pandas() for record_batch in parquet_file.iter_batches(batch_size=batch_rows))
+    return append_to_store(batches, source_path, store_dir)
+
+
+def read_store(store_dir=STORE_DIR, units=None, batches=None, columns=None):
+    """Normalized rows from the store, optionally only some units, batches or columns."""
+    manifest = read_store_manifest(store_dir)
+    if manifest is None:
+        raise FileNotFoundError(f'no transaction store in {store_dir!r}')
+    filters = [('Quantity unit', 'in', list(units))] if units is not None else None
+    frames = [pd.read_parquet(p, columns=columns, filters=filters) for p in _partition_files(store_dir, manifest, batches=batches)]
+    if not frames:
+        return None
+    return merge_transactions(frames)
+
+
+def merge_transactions(frames):
+    """Concatenate transaction frames and re-encode dimensions over their union."""
+    df = pd.concat(frames, ignore_index=True)
+    for col in DIMENSION_COLUMNS:
+        if col in df:
+            df[col] = df[col].astype(str)
+    return encode_dimensions(df)
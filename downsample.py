@@ -0,0 +1,90 @@
+import numpy as np
+import pandas as pd
+
+# Per-chart point budgets. Series at or below the budget are sent untouched.
+POINT_BUDGETS = {
+    'daily_trend': 1500,
+    'supplier_trend': 1000,
+}
+
+
+def _as_float(values):
+    values = np.asarray(values)
+    if np.issubdtype(values.dtype, np.datetime64):
+        return values.astype('datetime64[ns]').astype(np.int64).astype(np.float64)
+    return values.astype(np.float64)
+
+
+# --- SELECTION ALGORITHMS ---
+def lttb_indices(x, y, n_out):
+    """Largest-Triangle-Three-Buckets: indices of ``n_out`` points keeping the shape.
+
+    First and last points are always kept. Each interior bucket keeps the
+    point forming the largest triangle with the previously kept point and the
+    average of the next bucket.
+    """
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    x = _as_float(x)
+    y = _as_float(y)
+
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    indices = np.empty(n_out, dtype=np.int64)
+    indices[0] = 0
+    indices[-1] = n - 1
+
+    kept = 0
+    for i in range(n_out - 2):
+        start, stop = edges[i], edges[i + 1]
+        next_stop = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[stop:next_stop].mean()
+        avg_y = y[stop:next_stop].mean()
+        area = np.abs(
+            (x[kept] - avg_x) * (y[start:stop] - y[kept])
+            - (x[kept] - x[start:stop]) * (avg_y - y[kept])
+        )
+        kept = start + int(np.argmax(area))
+        indices[i + 1] = kept
+    return indices
+
+
+def minmax_indices(y, n_out):
+    """Indices of the first and last points plus the min and max of each of
+    ``(n_out - 2) // 2`` equal buckets.
+    """
+    n = len(y)
+    if n_out >= n or n_out < 2:
+        return np.arange(n)
+    y = _as_float(y)
+    edges = np.linspace(0, n, (n_out - 2) // 2 + 1).astype(np.int64)
+    # The endpoints pin the x-range, as in lttb_indices
+    picks = [0, n - 1]
+    for start, stop in zip(edges[:-1], edges[1:]):
+        bucket = y[start:stop]
+        picks.extend((start + int(np.argmin(bucket)), start + int(np.argmax(bucket))))
+    return np.unique(picks)
+
+
+METHODS = {
+    'lttb': lambda x, y, n_out: lttb_indices(x, y, n_out),
+    'minmax': lambda x, y, n_out: minmax_indices(y, n_out),
+}
+
+
+# --- PUBLIC API ---
+def downsample(x, y, max_points, method='lttb'):
+    """Return ``(x, y)`` reduced to at most ``max_points`` points.
+
+    A no-op when the series already fits the budget or ``max_points`` is
+    falsy, so it can be applied unconditionally before building a trace.
+    """
+    if not max_points or len(x) <= max_points:
+        return x, y
+    indices = METHODS[method](np.asarray(x), np.asarray(y), max_points)
+    if isinstance(x, (pd.Series, pd.Index)):
+        x = x[indices] if isinstance(x, pd.Index) else x.iloc[indices]
+    else:
+        x = np.asarray(x)[indices]
+    y = y.iloc[indices] if isinstance(y, pd.Series) else np.asarray(y)[indices]
+    return x, y
@@ -0,0 +1,262 @@
+import plotly.graph_objects as go
+from plotly.subplots import make_subplots
+
+from aggregations import (
+    category_split, daily_trend, memoized, supplier_trend, top_products, top_suppliers,
+)
+from downsample import POINT_BUDGETS, downsample
+
+# Built figures are memoized in the chart LRU next to the aggregations they
+# plot, keyed on the chart's inputs and the cube's token, so a new dataset
+# version never serves an old figure. Streamlit serializes a copy of the
+# figure on every render; the cached object itself must not be modified.
+
+# Colors: Matching HTML dashboard exactly
+PIE_COLORS = ['#8b5cf6', '#3b82f6', '#06b6d4', '#10b981', '#f59e0b', '#ef4444', '#ec4899', '#6366f1', '#14b8a6', '#f97316']
+TREND_COLORS = ['#8b5cf6', '#3b82f6', '#10b981', '#f59e0b']
+
+
+def _amount_bound(ranked, color):
+    # Approximate mode: the sketch's Amount is a lower bound; the error bar spans
+    # up to the upper bound. None (no error bar) for exact results.
+    if 'amount_bound' not in ranked:
+        return None
+    return dict(type='data', symmetric=False, array=ranked['amount_bound'],
+                arrayminus=[0] * len(ranked), color=color, thickness=1.5, width=4)
+
+
+def _approx_title(title, ranked):
+    return f"{title} (≈ approximate)" if 'amount_bound' in ranked else title
+
+
+# --- SECTION 1 ---
+@memoized
+def trend_figure(cube, units, start=None, end=None, smooth_days=None, units_label='All Units'):
+    """Dual-axis Amount vs quantity trend for the selected units."""
+    daily_data = daily_trend(cube, units, start, end, smooth_days)
+    # Each axis is downsampled on its own so both keep their shape within budget
+    amount_x, amount_y = downsample(daily_data['Transaction Date'], daily_data['Amount'], POINT_BUDGETS['daily_trend'])
+    volume_x, volume_y = downsample(daily_data['Transaction Date'], daily_data['quantity'], POINT_BUDGETS['daily_trend'])
+
+    fig_trend = make_subplots(specs=[[{"secondary_y": True}]])
+
+    # Amount Line (matching HTML dashboard)
+    fig_trend.add_trace(
+        go.Scatter(
+            x=amount_x,
+            y=amount_y,
+            name="Total Amount (USD)",
+            line=dict(color='#1f77b4', width=3),
+            fill='tozeroy',
+            fillcolor='rgba(31, 119, 180, 0.1)'
+        ), secondary_y=False
+    )
+
+    # Volume Line (matching HTML dashboard)
+    fig_trend.add_trace(
+        go.Scatter(
+            x=volume_x,
+            y=volume_y,
+            name=f"Quantity ({units_label})",
+            line=dict(color='#ff7f0e', width=3, dash='dot'),
+            fill='tozeroy',
+            fillcolor='rgba(255, 127, 14, 0.1)'
+        ), secondary_y=True
+    )
+
+    fig_trend.update_layout(
+        title=dict(text="Financial vs Volume Analysis", font=dict(color="#e2e8f0", size=16)),
+        hovermode='x unified',
+        plot_bgcolor='rgba(15, 23, 42, 0.3)',
+        paper_bgcolor='rgba(0, 0, 0, 0)',
+        font=dict(color='#94a3b8'),
+        height=500,
+        margin=dict(l=20, r=20, t=50, b=20),
+        legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1, font=dict(color='#e2e8f0'))
+    )
+
+    fig_trend.update_xaxes(showgrid=True, gridcolor='rgba(148, 163, 184, 0.1)')
+    fig_trend.update_yaxes(title_text="Total Amount (USD)", title_font=dict(color="#1f77b4", weight='bold'), secondary_y=False, showgrid=True, gridcolor='rgba(148, 163, 184, 0.1)')
+    fig_trend.update_yaxes(title_text="Quantity", title_font=dict(color="#ff7f0e", weight='bold'), secondary_y=True, showgrid=False)
+    return fig_trend
+
+
+# --- SECTION 2 ---
+@memoized
+def suppliers_figure(cube, unit, n=4):
+    """Grouped Amount/Volume bars for the top ``n`` suppliers of one unit."""
+    supplier_data = top_suppliers(cube, unit, n)
+
+    fig_sup = make_subplots(specs=[[{"secondary_y": True}]])
+
+    # Amount Bar (matching HTML dashboard)
+    fig_sup.add_trace(go.Bar(
+        x=supplier_data['Supplier'], y=supplier_data['Amount'], name='Amount (USD)',
+        marker_color='rgba(139, 92, 246, 0.8)',
+        marker_line=dict(color='rgba(139, 92, 246, 1)', width=2),
+        error_y=_amount_bound(supplier_data, '#c4b5fd'),
+        offsetgroup=1
+    ), secondary_y=False)
+
+    # Volume Bar (matching HTML dashboard)
+    fig_sup.add_trace(go.Bar(
+        x=supplier_data['Supplier'], y=supplier_data['quantity'], name='Volume',
+        marker_color='rgba(59, 130, 246, 0.8)',
+        marker_line=dict(color='rgba(59, 130, 246, 1)', width=2),
+        offsetgroup=2
+    ), secondary_y=True)
+
+    fig_sup.update_layout(
+        title=dict(text=_approx_title(f"Top {n} Suppliers", supplier_data), font=dict(color="#e2e8f0", size=16)),
+        plot_bgcolor='rgba(15, 23, 42, 0.3)',
+        paper_bgcolor='rgba(0, 0, 0, 0)',
+        font=dict(color='#94a3b8'),
+        height=450,
+        barmode='group',
+        legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1, font=dict(color='#e2e8f0'))
+    )
+    fig_sup.update_xaxes(showgrid=False)
+    fig_sup.update_yaxes(title_text="Amount (USD)", title_font=dict(color="#8b5cf6", weight='bold'), secondary_y=False, showgrid=True, gridcolor='rgba(148, 163, 184, 0.1)')
+    fig_sup.update_yaxes(title_text="Volume (Quantity)", title_font=dict(color="#3b82f6", weight='bold'), secondary_y=True, showgrid=False)
+    return fig_sup
+
+
+@memoized
+def category_figure(cube, unit, mode):
+    """Category donut for one unit, slices in ``category_split`` order."""
+    cat_data = category_split(cube, unit, mode)
+
+    # Calculate percentages for labels
+    total = cat_data['sort_val'].sum()
+    sorted_labels_with_pct = [f"{label} ({(val/total*100):.1f}%)"
+                               for label, val in zip(cat_data['category_group'], cat_data['sort_val'])]
+
+    fig_pie = go.Figure(data=[go.Pie(
+        labels=sorted_labels_with_pct,
+        values=cat_data['sort_val'],
+        hole=0.4,
+        marker=dict(
+            colors=PIE_COLORS,
+            line=dict(color='#1e293b', width=3)
+        ),
+        textinfo='percent',
+        textfont=dict(size=12, color='#fff', family='Inter'),
+        textposition='inside',
+        insidetextorientation='horizontal',
+        hovertemplate='<b>%{label}</b><br>Value: %{value:,.0f}<extra></extra>',
+        sort=False
+    )])
+
+    fig_pie.update_layout(
+        title=dict(text="Category Distribution", font=dict(color="#e2e8f0", size=16, weight='bold')),
+        plot_bgcolor='rgba(0, 0, 0, 0)',
+        paper_bgcolor='rgba(0, 0, 0, 0)',
+        font=dict(color='#e2e8f0'),
+        height=400,
+        showlegend=True,
+        legend=dict(
+            orientation="v",
+            yanchor="middle",
+            y=0.5,
+            xanchor="left",
+            x=1.02,
+            font=dict(color='#e2e8f0', size=11),
+            bgcolor='rgba(0, 0, 0, 0)',
+            itemsizing='constant'
+        ),
+        margin=dict(t=50, b=10, l=10, r=120),
+    )
+    return fig_pie
+
+
+@memoized
+def products_figure(cube, unit, category=None, n=5):
+    """Dual-axis horizontal bars for the top ``n`` products, optionally in one category."""
+    prod_agg = top_products(cube, unit, category, n)
+    chart_title = _approx_title(f"Top {n} in {category}" if category else f"Top {n} Products", prod_agg)
+
+    # Dual Axis Horizontal Bar
+    fig_prod = go.Figure()
+
+    # Amount (Axis 1 - Bottom) - matching HTML dashboard
+    fig_prod.add_trace(go.Bar(
+        y=prod_agg['short_name'],
+        x=prod_agg['Amount'],
+        name='Amount (USD)',
+        orientation='h',
+        marker_color='rgba(16, 185, 129, 0.8)',
+        marker_line=dict(color='rgba(16, 185, 129, 1)', width=2),
+        error_x=_amount_bound(prod_agg, '#6ee7b7'),
+        offsetgroup=1
+    ))
+
+    # Volume (Axis 2 - Top) - matching HTML dashboard
+    fig_prod.add_trace(go.Bar(
+        y=prod_agg['short_name'],
+        x=prod_agg['quantity'],
+        name='Volume',
+        orientation='h',
+        marker_color='rgba(245, 158, 11, 0.8)',
+        marker_line=dict(color='rgba(245, 158, 11, 1)', width=2),
+        offsetgroup=2,
+        xaxis='x2'
+    ))
+
+    fig_prod.update_layout(
+        title=dict(text=chart_title, font=dict(color="#e2e8f0", size=16)),
+        plot_bgcolor='rgba(15, 23, 42, 0.3)',
+        paper_bgcolor='rgba(0, 0, 0, 0)',
+        font=dict(color='#94a3b8'),
+        height=450,
+        barmode='group',
+        legend=dict(orientation="h", yanchor="bottom", y=1.05, xanchor="right", x=1, font=dict(color='#e2e8f0')),
+        xaxis=dict(
+            title="Amount (USD)",
+            title_font=dict(color="#10b981", weight='bold'),
+            tickfont=dict(color='#94a3b8'),
+            showgrid=True,
+            gridcolor='rgba(148, 163, 184, 0.1)',
+        ),
+        xaxis2=dict(
+            title="Volume",
+            title_font=dict(color="#f59e0b", weight='bold'),
+            tickfont=dict(color='#94a3b8'),
+            showgrid=False,
+            overlaying='x',
+            side='top'
+        ),
+        yaxis=dict(showgrid=False)
+    )
+    return fig_prod
+
+
+@memoized
+def supplier_trend_figure(cube, unit, mode, n=4, freq='D'):
+    """One line per top-``n`` supplier over time, each downsampled to its budget."""
+    sup_trend = supplier_trend(cube, unit, mode, n, freq)
+
+    fig_comp = go.Figure()
+    for i, sup in enumerate(sup_trend.columns):
+        sup_x, sup_y = downsample(sup_trend.index, sup_trend[sup], POINT_BUDGETS['supplier_trend'])
+        fig_comp.add_trace(go.Scatter(
+            x=sup_x, y=sup_y, name=sup,
+            line=dict(color=TREND_COLORS[i%len(TREND_COLORS)], width=3)
+        ))
+
+    fig_comp.update_layout(
+        title=dict(text=f"Top {n} Suppliers Trend (Continuous)", font=dict(color="#e2e8f0", size=16)),
+        plot_bgcolor='rgba(15, 23, 42, 0.3)',
+        paper_bgcolor='rgba(0, 0, 0, 0)',
+        font=dict(color='#94a3b8'),
+        height=450,
+        hovermode='x unified',
+        legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1, font=dict(color='#e2e8f0'))
+    )
+    fig_comp.update_xaxes(showgrid=True, gridcolor='rgba(148, 163, 184, 0.1)')
+    fig_comp.update_yaxes(
+        showgrid=True,
+        gridcolor='rgba(148, 163, 184, 0.1)',
+        title_text="Amount (USD)" if mode == 'Amount' else "Volume (Quantity)",
+        title_font=dict(color="#8b5cf6", weight='bold')
+    )
+    return fig_comp
@@ -0,0 +1,138 @@
+import numpy as np
+
+UNIT = 'Quantity unit'
+
+
+# --- UNIT RANGE INDEX ---
+def build_unit_index(df, unit_col=UNIT):
+    """Map each unit to the (start, stop) row range it occupies in ``df``.
+
+    ``df`` must be laid out unit-first (as every cube roll-up is), so each
+    unit is one contiguous block and selecting it is a positional slice.
+    """
+    codes = df[unit_col].cat.codes.to_numpy()
+    if len(codes) and (np.diff(codes) < 0).any():
+        raise ValueError(f"frame is not sorted by '{unit_col}'")
+    bounds = np.flatnonzero(np.diff(codes)) + 1
+    starts = np.r_[0, bounds]
+    stops = np.r_[bounds, len(codes)]
+    categories = df[unit_col].cat.categories
+    return {
+        categories[codes[start]]: (int(start), int(stop))
+        for start, stop in zip(starts, stops)
+        if stop > start
+    }
+
+
+def take_units(df, unit_index, units):
+    """Rows of ``df`` for the given unit(s), as a slice or concatenated ranges."""
+    if isinstance(units, str):
+        units = [units]
+    ranges = []
+    for start, stop in sorted(unit_index[u] for u in set(units) if u in unit_index):
+        # Adjacent units collapse into one range, so "all units" is a plain slice
+        if ranges and ranges[-1][1] == start:
+            ranges[-1] = (ranges[-1][0], stop)
+        else:
+            ranges.append((start, stop))
+    if not ranges:
+        return df.iloc[0:0]
+    if len(ranges) == 1:
+        return df.iloc[ranges[0][0]:ranges[0][1]]
+    return df.iloc[np.concatenate([np.arange(start, stop) for start, stop in ranges])]
+
+
+# --- DISTINCT-MEMBERSHIP BITSETS ---
+def build_bitsets(df, dim_col, unit_col=UNIT):
+    """Per-unit membership bitsets over the category codes of ``dim_col``.
+
+    Row ``i`` of ``bits`` has bit ``j`` set when unit ``i`` has at least one
+    row with the ``j``-th value of ``dim_col``. Distinct counts are not
+    additive, but the count over any set of units is the popcount of the
+    OR of their rows.
+    """
+    units = df[unit_col].cat.categories
+    values = df[dim_col].cat.categories
+    members = np.zeros((len(units), len(values)), dtype=bool)
+    members[df[unit_col].cat.codes.to_numpy(), df[dim_col].cat.codes.to_numpy()] = True
+    return {
+        'rows': {unit: i for i, unit in enumerate(units)},
+        'values': values,
+        'bits': np.packbits(members, axis=1),
+    }
+
+
+def union_bits(bitsets, units):
+    """OR of the bitsets of the given unit(s), as a packed uint8 array."""
+    if isinstance(units, str):
+        units = [units]
+    rows = [bitsets['rows'][u] for u in set(units) if u in bitsets['rows']]
+    if not rows:
+        return np.zeros(bitsets['bits'].shape[1], dtype=np.uint8)
+    return np.bitwise_or.reduce(bitsets['bits'][rows], axis=0)
+
+
+def count_distinct(bitsets, units):
+    """Exact number of distinct values across the given unit(s)."""
+    return int(np.unpackbits(union_bits(bitsets, units)).sum())
+
+
+def distinct_values(bitsets, units):
+    """The distinct values present across the given unit(s)."""
+    members = np.unpackbits(union_bits(bitsets, units))[:len(bitsets['values'])].astype(bool)
+    return list(bitsets['values'][members])
+
+
+# --- DATE PREFIX SUMS ---
+def build_date_prefix(daily, unit_index, measures, date_col='Transaction Date'):
+    """Per-unit sorted dates with cumulative sums of ``measures``.
+
+    ``daily`` is a unit-first, date-sorted frame with one row per (unit,
+    date), such as the cube's ``unit_date`` roll-up. The total of a measure
+    over any date window is then two binary searches and a difference.
+    """
+    dates = daily[date_col].to_numpy()
+    prefix = {}
+    for unit, (start, stop) in unit_index.items():
+        prefix[unit] = {
+            'offset': start,
+            'dates': dates[start:stop],
+            'cum': {m: np.r_[0, np.cumsum(daily[m].to_numpy()[start:stop])] for m in measures},
+        }
+    return prefix
+
+
+def date_bounds(dates, start=None, end=None):
+    """``(lo, hi)`` positions of the inclusive window [start, end] in sorted ``dates``."""
+    lo = 0 if start is None else int(np.searchsorted(dates, np.datetime64(start, 'ns'), side='left'))
+    hi = len(dates) if end is None else int(np.searchsorted(dates, np.datetime64(end, 'ns'), side='right'))
+    return lo, max(lo, hi)
+
+
+def range_totals(prefix, units, start=None, end=None):
+    """Measure totals over the given unit(s) within [start, end], from prefix sums."""
+    if isinstance(units, str):
+        units = [units]
+    totals = None
+    for unit in set(units):
+        if unit not in prefix:
+            continue
+        entry = prefix[unit]
+        lo, hi = date_bounds(entry['dates'], start, end)
+        if totals is None:
+            totals = dict.fromkeys(entry['cum'], 0.0)
+        for measure, cum in entry['cum'].items():
+            totals[measure] += cum[hi] - cum[lo]
+    return totals or {}
+
+
+def trailing_mean(dates, values, window_days):
+    """Mean over the trailing ``window_days`` calendar days at each date.
+
+    ``dates`` must be sorted. Uses a prefix sum plus one vectorised binary
+    search, so it is linear in the number of points whatever the window.
+    """
+    dates = np.asarray(dates, dtype='datetime64[ns]')
+    cum = np.r_[0, np.cumsum(np.asarray(values, dtype=np.float64))]
+    lo = np.searchsorted(dates, dates - np.timedelta64(window_days, 'D'), side='right')
+    return (cum[1:] - cum[lo]) / window_days
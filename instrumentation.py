@@ -0,0 +1,120 @@
+import json
+import logging
+import os
+import sys
+import time
+import uuid
+
+# Opt-in: DASHBOARD_INSTRUMENT=1 for every session, or ?debug=1 for one browser tab
+INSTRUMENT_ENV = 'DASHBOARD_INSTRUMENT'
+QUERY_PARAM = 'debug'
+_TRUE = ('1', 'true', 'yes', 'on')
+
+logger = logging.getLogger('dashboard.timing')
+if not logger.handlers:
+    # One JSON object per line on stderr, next to Streamlit's own log
+    _handler = logging.StreamHandler(sys.stderr)
+    _handler.setFormatter(logging.Formatter('%(message)s'))
+    logger.addHandler(_handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+
+def instrumentation_enabled(query_params):
+    """True when the env var or the ``debug`` query parameter asks for timings."""
+    if os.environ.get(INSTRUMENT_ENV, '').lower() in _TRUE:
+        return True
+    return str(query_params.get(QUERY_PARAM, '')).lower() in _TRUE
+
+
+class RerunTimer:
+    """Lap timer for one rerun of the app script.
+
+    ``lap(name)`` attributes the time since the previous lap (or the start)
+    to ``name``, so the script is instrumented by dropping one call after
+    each step instead of re-indenting it into ``with`` blocks.
+    """
+
+    enabled = True
+
+    def __init__(self, rerun_id, **context):
+        self.rerun_id = rerun_id
+        self.context = context
+        self.sections = []
+        self.finished = False
+        self._start = self._last = time.perf_counter()
+
+    def lap(self, name):
+        now = time.perf_counter()
+        self.sections.append((name, now - self._last))
+        self._last = now
+
+    @property
+    def total(self):
+        return self._last - self._start
+
+    def finish(self, **extra):
+        """Log the rerun as one JSON line and return the logged record."""
+        record = {
+            'event': 'rerun',
+            'rerun_id': self.rerun_id,
+            'ts': time.time(),
+            'total_ms': round(self.total * 1000, 3),
+            'sections': {name: round(seconds * 1000, 3) for name, seconds in self.sections},
+            **self.context,
+            **extra,
+        }
+        logger.info(json.dumps(record, default=str))
+        self.finished = True
+        return record
+
+
+class _NullTimer:
+    # Stand-in when instrumentation is off: every call is a no-op
+    enabled = False
+    finished = False
+    rerun_id = None
+    sections = ()
+    total = 0.0
+
+    def lap(self, name):
+        pass
+
+    def finish(self, **extra):
+        return None
+
+
+NULL_TIMER = _NullTimer()
+
+
+def start_rerun(session_state, enabled, **context):
+    """A timer for this rerun, or the no-op timer when instrumentation is off.
+
+    Rerun IDs are ``<session>-<sequence>``, so log lines from one browser tab
+    can be followed across reruns.
+    """
+    if not enabled:
+        session_state.pop('_instrument_timer', None)
+        return NULL_TIMER
+    if '_instrument_session' not in session_state:
+        session_state['_instrument_session'] = uuid.uuid4().hex[:8]
+        session_state['_instrument_seq'] = 0
+    session_state['_instrument_seq'] += 1
+    rerun_id = f"{session_state['_instrument_session']}-{session_state['_instrument_seq']}"
+    timer = session_state['_instrument_timer'] = RerunTimer(rerun_id, **context)
+    return timer
+
+
+def fragment_timer(session_state, fragment, **context):
+    """The timer a fragment body should lap into, and whether the fragment owns it.
+
+    During a full rerun that is the rerun's own timer. A fragment-only rerun
+    never reaches the end of the script, so it gets a fresh timer (tagged
+    with ``fragment``) that the fragment finishes and logs itself.
+    """
+    timer = session_state.get('_instrument_timer')
+    if timer is None:
+        return NULL_TIMER, False
+    if not timer.finished:
+        return timer, False
+    return start_rerun(session_state, True, fragment=fragment, **context), True
@@ -0,0 +1,129 @@
+import logging
+import os
+import threading
+import time
+
+from cube import build_cube, update_cube
+from data_store import (
+    CACHE_DIR, SOURCE_FILE, STORE_DIR, load_shared_dataset, parquet_sources, read_store, store_version,
+)
+from sketches import APPROXIMATE
+from sql_backend import SqlCube
+
+# How often the watcher looks for a changed workbook or new store batches; 0 disables it
+RELOAD_POLL_SECONDS = float(os.environ.get('DATASET_RELOAD_SECONDS', 5))
+
+logger = logging.getLogger('dashboard.reload')
+
+
+class LiveDataset:
+    """The current cube (or SQL view), rebuilt in the background when the data changes.
+
+    ``snapshot()`` returns an immutable dict -- ``cube``, ``version``,
+    ``signature``, ``loaded_at`` -- that a request should fetch once and use
+    throughout, so it sees one consistent dataset. A daemon thread polls the
+    data's signature (the store's last batch id, or the workbook's
+    mtime/size) and builds the replacement off to the side; it is published
+    with a single reference assignment, so readers never wait on a rebuild
+    and never see a partial one. New store batches are folded into the cube
+    incrementally; anything else (a replaced workbook, a first append) is a
+    full rebuild. ``approximate`` builds the pandas cube with sketches.
+    """
+
+    def __init__(self, backend='pandas', source=SOURCE_FILE, cache_dir=CACHE_DIR, store_dir=STORE_DIR,
+                 poll_seconds=RELOAD_POLL_SECONDS, approximate=APPROXIMATE):
+        self.backend = backend
+        self.source = source
+        self.cache_dir = cache_dir
+        self.store_dir = store_dir
+        self.poll_seconds = poll_seconds
+        self.approximate = approximate
+        self.last_error = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._pending = None
+        self._failed = None
+        signature = self._signature()
+        self._snapshot = self._publish(self._open(signature), signature, version=1)
+
+    def snapshot(self):
+        return self._snapshot
+
+    # --- WATCHER ---
+    def start(self):
+        """Start the background watcher (once); returns ``self``."""
+        if self._thread is None and self.poll_seconds > 0:
+            self._thread = threading.Thread(target=self._watch, name='dataset-reload', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _watch(self):
+        while not self._stop.wait(self.poll_seconds):
+            self.check()
+
+    def check(self):
+        """Swap in a rebuilt snapshot if the data changed; True when it did.
+
+        A changed workbook is only read once its mtime/size held still for a
+        poll interval, so a file that is still being copied is not parsed.
+        A rebuild that fails keeps the current snapshot and is not retried
+        until the data changes again.
+        """
+        with self._lock:
+            try:
+                signature = self._signature()
+            except OSError as e:
+                # The workbook is briefly missing while it is being replaced
+                self.last_error = f'{type(e).__name__}: {e}'
+                return False
+            current = self._snapshot
+            if signature in (current['signature'], self._failed):
+                return False
+            if signature[0] == 'source' and signature != self._pending:
+                self._pending = signature
+                return False
+            try:
+                cube = self._rebuild(current, signature)
+            except Exception as e:  # keep serving the current snapshot
+                self._failed = signature
+                self.last_error = f'{type(e).__name__}: {e}'
+                logger.warning('dataset reload failed, still serving version %s: %s', current['version'], self.last_error)
+                return False
+            self._snapshot = self._publish(cube, signature, current['version'] + 1)
+            self.last_error = None
+            logger.info('dataset version %s loaded (%s)', self._snapshot['version'], signature)
+            return True
+
+    # --- LOADING ---
+    def _signature(self):
+        version = store_version(self.store_dir)
+        if version is not None:
+            return ('store', version)
+        stat = os.stat(self.source)
+        return ('source', stat.st_mtime_ns, stat.st_size)
+
+    def _open(self, signature):
+        # Read the store only up to the batch the signature recorded: a batch
+        # appended since then is picked up (once) by the next check()
+        batches = set(range(1, signature[1] + 1)) if signature[0] == 'store' else None
+        if self.backend == 'duckdb':
+            return SqlCube(parquet_sources(self.source, self.cache_dir, self.store_dir, batches))
+        return build_cube(load_shared_dataset(self.source, self.cache_dir, self.store_dir, batches), self.approximate)
+
+    def _rebuild(self, current, signature):
+        old = current['signature']
+        if self.backend == 'duckdb' or not (old[0] == signature[0] == 'store' and signature[1] > old[1]):
+            # A new SQL view only needs to list the new partition files
+            return self._open(signature)
+        new_rows = read_store(self.store_dir, batches=set(range(old[1] + 1, signature[1] + 1)))
+        return update_cube(current['cube'], new_rows) if new_rows is not None else current['cube']
+
+    @staticmethod
+    def _publish(cube, signature, version):
+        return {'cube': cube, 'version': version, 'signature': signature, 'loaded_at': time.time()}
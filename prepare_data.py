@@ -1,48 +1,299 @@
-import pandas as pd
+import argparse
+import gzip
 import json
+import os
+import re
+import time
+
+import pandas as pd
 import numpy as np
 from datetime import datetime
 
-# Read the Excel file
-df = pd.read_excel('tetra_pak_final_data_finish.xlsx')
-
-# Convert Transaction Date to string format for JSON
-df['Transaction Date'] = pd.to_datetime(df['Transaction Date'], errors='coerce')
-df = df.dropna(subset=['Transaction Date'])
-df['Transaction Date'] = df['Transaction Date'].dt.strftime('%Y-%m-%d')
-
-# Convert numeric columns
-df['Amount'] = pd.to_numeric(df['Amount'], errors='coerce').fillna(0)
-df['quantity'] = pd.to_numeric(df['quantity'], errors='coerce').fillna(0)
-
-# Fill missing values
-df['Quantity unit'] = df['Quantity unit'].astype(str).str.strip().fillna('Unknown')
-df['category_group'] = df['category_group'].astype(str).fillna('Unknown')
-df['standardized_name'] = df['standardized_name'].astype(str).fillna('Unknown')
-
-# Get supplier column name (it might be 'Supplier Name' or similar)
-supplier_cols = [col for col in df.columns if 'supplier' in col.lower() or 'vendor' in col.lower()]
-if supplier_cols:
-    supplier_col = supplier_cols[0]
-    df['Supplier'] = df[supplier_col].astype(str).fillna('Unknown')
-else:
-    # If no supplier column, try to infer from standardized_name
-    df['Supplier'] = df['standardized_name']
-
-# CRITICAL: Replace ALL NaN, inf, and -inf values with None (which becomes null in JSON)
-# This is the fix for the JSON parsing error
-df = df.replace([np.nan, np.inf, -np.inf], None)
-
-# Convert to JSON
-data_json = df.to_dict('records')
-
-# Save to JSON file with proper handling of None values
-with open('tetra_pak_data.json', 'w') as f:
-    json.dump(data_json, f, allow_nan=False)
-
-print(f"Data exported successfully!")
-print(f"Total records: {len(df)}")
-print(f"Columns: {list(df.columns)}")
-print(f"Date range: {df['Transaction Date'].min()} to {df['Transaction Date'].max()}")
-print(f"Unique Quantity units: {df['Quantity unit'].unique()[:10]}")
-print(f"Unique category_groups: {df['category_group'].unique()[:10]}")
+from data_store import DIMENSION_COLUMNS, INGEST_BATCH_ROWS, STORE_DIR, ensure_cache, read_store, seed_store
+from ingest import append_sources, expand_sources, load_sources, source_parts, timing_report
+
+try:
+    import brotli
+except ImportError:  # optional: only needed for the .br variant
+    brotli = None
+
+SOURCE_FILE = 'tetra_pak_final_data_finish.xlsx'
+RECORDS_FILE = 'tetra_pak_data.json'
+COLUMNAR_FILE = 'tetra_pak_data.columnar.json'
+SHARD_DIR = 'data'
+
+# Columns the HTML dashboard reads; the columnar export carries only these
+DASHBOARD_COLUMNS = ['Transaction Date', 'Amount', 'quantity', 'Quantity unit',
+                     'Supplier', 'category_group', 'standardized_name']
+# String columns stored as a dictionary + integer codes in the columnar export
+DICTIONARY_COLUMNS = ['Transaction Date', 'Quantity unit', 'Supplier',
+                      'category_group', 'standardized_name']
+
+
+def load_frame(source=SOURCE_FILE, batch_rows=INGEST_BATCH_ROWS):
+    """Export-ready rows of one workbook or CSV, read through its Parquet cache.
+
+    The cache is built by normalizing and writing ``batch_rows`` rows at a
+    time, so the raw object-typed rows are never all in memory at once; an
+    up-to-date cache is reused without parsing the workbook at all.
+    """
+    return export_frame(pd.read_parquet(ensure_cache(source, batch_rows=batch_rows)))
+
+
+def export_frame(df):
+    """Normalized rows (cache or store) as JSON-ready strings, numbers and None."""
+    df = df.copy()
+    df['Transaction Date'] = df['Transaction Date'].dt.strftime('%Y-%m-%d')
+    for col in DIMENSION_COLUMNS:
+        df[col] = df[col].astype(str)
+    return df.replace([np.nan, np.inf, -np.inf], None)
+
+
+# --- EXPORTS ---
+def export_records(df, path=RECORDS_FILE, batch_rows=INGEST_BATCH_ROWS):
+    # Convert to JSON batch_rows rows at a time, so the row dicts of the
+    # whole dataset never exist at once; the file is the same as one dump
+    with open(path, 'w') as f:
+        f.write('[')
+        for start in range(0, len(df), batch_rows):
+            if start:
+                f.write(', ')
+            # Save with proper handling of None values
+            records = df.iloc[start:start + batch_rows].to_dict('records')
+            f.write(json.dumps(records, allow_nan=False)[1:-1])
+        f.write(']')
+    return path
+
+
+def to_columnar(df):
+    """Column-per-array payload; string dimensions become dictionary + codes.
+
+    ``index.html`` decodes it back into row objects (see ``decodeColumnar``).
+    """
+    columns = {}
+    for col in DASHBOARD_COLUMNS:
+        if col in DICTIONARY_COLUMNS:
+            codes, values = pd.factorize(df[col], sort=True)
+            columns[col] = {'dict': values.tolist(), 'codes': codes.tolist()}
+        else:
+            columns[col] = df[col].tolist()
+    return {'format': 'columnar-v1', 'rows': len(df), 'columns': columns}
+
+
+def write_json_variants(obj, path):
+    """Write compact JSON plus .gz and (if brotli is installed) .br variants."""
+    payload = json.dumps(obj, allow_nan=False, separators=(',', ':')).encode('utf-8')
+    written = [path]
+    with open(path, 'wb') as f:
+        f.write(payload)
+    with open(f'{path}.gz', 'wb') as f:
+        f.write(gzip.compress(payload, compresslevel=9, mtime=0))
+    written.append(f'{path}.gz')
+    if brotli is not None:
+        with open(f'{path}.br', 'wb') as f:
+            f.write(brotli.compress(payload, quality=11))
+        written.append(f'{path}.br')
+    return written
+
+
+def export_columnar(df, path=COLUMNAR_FILE):
+    """Write the columnar JSON export and its compressed variants."""
+    return write_json_variants(to_columnar(df), path)
+
+
+def _shard_name(position, unit):
+    slug = re.sub(r'[^0-9A-Za-z]+', '_', unit).strip('_').lower()
+    return f'unit_{position:02d}_{slug}.json'
+
+
+def build_manifest(df, shard_names):
+    """Per-unit totals, date range, supplier count and daily series.
+
+    Enough for the stats cards and the Section 1 trend without any shard:
+    its size grows with units x active days, not with transactions.
+    """
+    units = [_unit_entry(unit, unit_df, shard_names[unit])
+             for unit, unit_df in df.groupby('Quantity unit', sort=True)]
+    return _manifest(units, int(df['Supplier'].nunique()))
+
+
+def _unit_entry(unit, unit_df, shard):
+    daily = unit_df.groupby('Transaction Date')[['Amount', 'quantity']].sum()
+    return {
+        'unit': unit,
+        'shard': shard,
+        'rows': len(unit_df),
+        'amount': float(unit_df['Amount'].sum()),
+        'volume': float(unit_df['quantity'].sum()),
+        'date_min': unit_df['Transaction Date'].min(),
+        'date_max': unit_df['Transaction Date'].max(),
+        'suppliers': int(unit_df['Supplier'].nunique()),
+        'daily': {
+            'dates': daily.index.tolist(),
+            'amount': daily['Amount'].tolist(),
+            'volume': daily['quantity'].tolist(),
+        },
+    }
+
+
+def _manifest(units, suppliers):
+    return {
+        'format': 'manifest-v1',
+        'generated_at': datetime.now().isoformat(timespec='seconds'),
+        'totals': {
+            'rows': sum(u['rows'] for u in units),
+            'amount': sum(u['amount'] for u in units),
+            'volume': sum(u['volume'] for u in units),
+            'suppliers': suppliers,
+        },
+        'units': units,
+    }
+
+
+def export_shards(df, shard_dir=SHARD_DIR):
+    """One columnar shard per Quantity unit plus ``manifest.json``."""
+    os.makedirs(shard_dir, exist_ok=True)
+    shard_names = {}
+    written = []
+    for position, (unit, unit_df) in enumerate(df.groupby('Quantity unit', sort=True)):
+        shard_names[unit] = _shard_name(position, unit)
+        written.extend(write_json_variants(to_columnar(unit_df), os.path.join(shard_dir, shard_names[unit])))
+    manifest_path = os.path.join(shard_dir, 'manifest.json')
+    written = write_json_variants(build_manifest(df, shard_names), manifest_path) + written
+    return written
+
+
+# --- INCREMENTAL (APPEND) MODE ---
+def update_shards(units, store_dir=STORE_DIR, shard_dir=SHARD_DIR):
+    """Rewrite the shards and manifest entries of ``units`` from the store.
+
+    Other units keep their shard files and manifest entries; only the
+    totals are recomputed. Without an existing manifest every unit is
+    exported.
+    """
+    manifest_path = os.path.join(shard_dir, 'manifest.json')
+    try:
+        with open(manifest_path) as f:
+            previous = json.load(f)
+    except (OSError, ValueError):
+        return export_shards(export_frame(read_store(store_dir)), shard_dir)
+
+    entries = {entry['unit']: entry for entry in previous['units']}
+    shard_names = {unit: entry['shard'] for unit, entry in entries.items()}
+    df = export_frame(read_store(store_dir, units=units))
+    written = []
+    for unit, unit_df in df.groupby('Quantity unit', sort=True):
+        if unit not in shard_names:
+            shard_names[unit] = _shard_name(len(shard_names), unit)
+        written.extend(write_json_variants(to_columnar(unit_df), os.path.join(shard_dir, shard_names[unit])))
+        entries[unit] = _unit_entry(unit, unit_df, shard_names[unit])
+
+    suppliers = read_store(store_dir, columns=['Supplier'])['Supplier'].nunique()
+    manifest = _manifest([entries[unit] for unit in sorted(entries)], int(suppliers))
+    return write_json_variants(manifest, manifest_path) + written
+
+
+def load_any(sources, workers=None, batch_rows=INGEST_BATCH_ROWS):
+    """Export-ready frame from one workbook, or from many files/sheets in parallel."""
+    parts = [part for path in expand_sources(sources) for part in source_parts(path)]
+    if len(parts) == 1:
+        return load_frame(parts[0][0], batch_rows)
+    df, reports, wall_seconds = load_sources(sources, workers, batch_rows)
+    timing_report(reports, wall_seconds)
+    return export_frame(df)
+
+
+def append_mode(paths, formats, store_dir=STORE_DIR, batch_rows=INGEST_BATCH_ROWS, workers=None,
+                seed_source=SOURCE_FILE):
+    """Append new extracts to the store and refresh the exports they affect.
+
+    The first append seeds the store with ``seed_source``'s rows, so the
+    store keeps the workbook's history when it takes over from it.
+    """
+    seed = seed_store(seed_source, store_dir=store_dir, batch_rows=batch_rows)
+    if seed is not None:
+        print(f"Seeded {store_dir}/ with the {seed['rows']} transactions of {seed_source}")
+    batches, reports, wall_seconds = append_sources(paths, store_dir, workers, batch_rows)
+    timing_report(reports, wall_seconds)
+    if not batches:
+        print("No new transactions: every row is already in the store.")
+        return []
+    units = sorted(set().union(*(batch['units'] for batch in batches)))
+    months = sorted(set().union(*(batch['months'] for batch in batches)))
+    print(f"Appended {sum(batch['rows'] for batch in batches)} new transactions for {len(units)} units "
+          f"({months[0]} to {months[-1]})")
+
+    written = []
+    if formats in ('sharded', 'all'):
+        written.extend(update_shards(units, store_dir))
+    if formats in ('records', 'columnar', 'both', 'all'):
+        # Single-file exports cover every unit, so they are rewritten in full
+        df = export_frame(read_store(store_dir))
+        if formats in ('records', 'both', 'all'):
+            written.append(export_records(df, batch_rows=batch_rows))
+        if formats in ('columnar', 'both', 'all'):
+            written.extend(export_columnar(df))
+    return written
+
+
+def payload_report(paths):
+    """Print size and json.loads time for each plain JSON export and its variants."""
+    print(f"{'file':<48}{'bytes':>14}{'parse (ms)':>12}")
+    for path in paths:
+        with open(path, 'rb') as f:
+            raw = f.read()
+        parse_ms = ''
+        if path.endswith('.json'):
+            start = time.perf_counter()
+            json.loads(raw)
+            parse_ms = f"{(time.perf_counter() - start) * 1000:.1f}"
+        print(f"{path:<48}{len(raw):>14,}{parse_ms:>12}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Export the workbook as JSON for the HTML dashboard.')
+    parser.add_argument('--source', nargs='+', default=[SOURCE_FILE],
+                        help='Workbooks/CSVs, directories or globs; several files or sheets are '
+                             'parsed in parallel and merged')
+    parser.add_argument('--format', choices=['records', 'columnar', 'sharded', 'both', 'all'], default=None,
+                        help="'records' is the legacy row-per-object file, 'columnar' the compact one, "
+                             "'sharded' one file per unit plus a manifest; 'both' = records + columnar. "
+                             "Defaults to 'all', or 'sharded' with --append")
+    parser.add_argument('--append', nargs='+', metavar='SOURCE',
+                        help='Excel/CSV extracts (files, directories or globs) to de-duplicate and append '
+                             'to the transaction store; only the affected units are re-exported')
+    parser.add_argument('--store', default=STORE_DIR, help='Transaction store directory used by --append')
+    parser.add_argument('--batch-rows', type=int, default=INGEST_BATCH_ROWS,
+                        help='Rows parsed per step; bounds memory while reading (default: %(default)s)')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Parser processes for multi-file/multi-sheet input (default: CPU count)')
+    args = parser.parse_args()
+
+    if args.append:
+        payload_report(append_mode(args.append, args.format or 'sharded', args.store, args.batch_rows, args.workers))
+        return
+    args.format = args.format or 'all'
+
+    df = load_any(args.source, args.workers, args.batch_rows)
+    if brotli is None and args.format != 'records':
+        print("brotli not installed; skipping the .br variants (pip install brotli)")
+
+    written = []
+    if args.format in ('records', 'both', 'all'):
+        written.append(export_records(df, batch_rows=args.batch_rows))
+    if args.format in ('columnar', 'both', 'all'):
+        written.extend(export_columnar(df))
+    if args.format in ('sharded', 'all'):
+        written.extend(export_shards(df))
+
+    print(f"Data exported successfully!")
+    print(f"Total records: {len(df)}")
+    print(f"Columns: {list(df.columns)}")
+    print(f"Date range: {df['Transaction Date'].min()} to {df['Transaction Date'].max()}")
+    print(f"Unique Quantity units: {df['Quantity unit'].unique()[:10]}")
+    print(f"Unique category_groups: {df['category_group'].unique()[:10]}")
+    payload_report(written)
+
+
+if __name__ == '__main__':
+    main()
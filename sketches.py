@@ -0,0 +1,332 @@
+import math
+import os
+
+import numpy as np
+import pandas as pd
+
+UNIT = 'Quantity unit'
+DATE = 'Transaction Date'
+SUPPLIER = 'Supplier'
+CATEGORY = 'category_group'
+PRODUCT = 'standardized_name'
+
+# Opt-in: DASHBOARD_APPROXIMATE=1 builds the cube with sketches instead of the
+# exact bitsets and top-K index, and Active Suppliers and the top-N charts are
+# then answered from them
+APPROXIMATE = os.environ.get('DASHBOARD_APPROXIMATE', '').lower() in ('1', 'true', 'yes', 'on')
+# 2**p one-byte registers per (unit, day) and dimension; relative error 1.04 / sqrt(2**p).
+# Registers are stored sparsely (p <= 16), one (key, index, rank) entry of 11 bytes per
+# non-zero register: a (unit, day) costs 11 bytes per distinct value it saw,
+# never more than 11 * 2**p. Queries merge their window into one dense array.
+HLL_PRECISION = int(os.environ.get('SKETCH_HLL_PRECISION', 10))
+# Misra-Gries counters (by Amount) kept per (unit, day) summary
+HEAVY_HITTERS = int(os.environ.get('SKETCH_HEAVY_HITTERS', 16))
+
+DISTINCT_DIMS = [SUPPLIER, PRODUCT]
+# Products are summarized per (day, category) so the products chart can filter by category
+HEAVY_DIMS = {SUPPLIER: None, PRODUCT: CATEGORY}
+VOCABULARY_DIMS = [UNIT, CATEGORY, SUPPLIER, PRODUCT]
+
+# (unit, day) keys: unit id * DAY_RANGE + days since 1970 + DAY_OFFSET
+DAY_RANGE = 1 << 21
+DAY_OFFSET = 1 << 20
+
+
+# --- HYPERLOGLOG ---
+def hash_values(values):
+    """Stable 64-bit hashes of ``values`` (independent of category codes)."""
+    return pd.util.hash_array(np.asarray(values, dtype=object))
+
+
+def _bit_length(x):
+    # Exact for uint64: each 32-bit half fits a float64 mantissa
+    high = (x >> np.uint64(32)).astype(np.float64)
+    low = (x & np.uint64(0xFFFFFFFF)).astype(np.float64)
+    return np.where(high > 0, 32 + np.frexp(high)[1], np.frexp(low)[1])
+
+
+def hll_slots(hashes, precision=HLL_PRECISION):
+    """Register index and rank of each hash.
+
+    The top ``precision`` bits pick the register; the rank is the position
+    of the first set bit in the rest. A register keeps the highest rank it
+    has seen, so rows of registers merge with an element-wise max.
+    """
+    hashes = np.asarray(hashes, dtype=np.uint64)
+    index = (hashes >> np.uint64(64 - precision)).astype(np.intp)
+    rest = hashes << np.uint64(precision)
+    rank = np.minimum(65 - _bit_length(rest), 64 - precision + 1).astype(np.uint8)
+    return index, rank
+
+
+def hll_count(registers):
+    """Distinct-count estimate from one (merged) row of registers."""
+    m = registers.size
+    alpha = {16: 0.673, 32: 0.697, 64: 0.709}.get(m, 0.7213 / (1 + 1.079 / m))
+    estimate = alpha * m * m / np.sum(np.exp2(-registers.astype(np.float64)))
+    zeros = int(np.count_nonzero(registers == 0))
+    if estimate <= 2.5 * m and zeros:
+        # Small-range correction: linear counting over the empty registers
+        return m * math.log(m / zeros)
+    return float(estimate)
+
+
+def hll_relative_error(precision=HLL_PRECISION):
+    """Relative standard error of a HyperLogLog estimate at ``precision``."""
+    return 1.04 / math.sqrt(1 << precision)
+
+
+# --- HEAVY HITTERS ---
+def misra_gries(group, item, amount, extra, k=HEAVY_HITTERS):
+    """Reduce weighted ``(group, item)`` counts to a Misra-Gries summary per group.
+
+    ``group`` and ``item`` are non-negative integer ids. Counts of the same
+    item in a group are added first. Then, in every group with more than
+    ``k`` items, the ``k+1``-th largest count is subtracted from all of them
+    and only positive counters are kept. Returns the kept ``(group, item,
+    amount, extra)`` and the ``(group, deducted)`` amount subtracted per
+    group.
+
+    A counter never exceeds its item's true weight and falls short of it by
+    at most the group's total deductions, which are at most ``W / (k+1)``
+    for a group of total weight ``W``. Merging summaries is concatenating
+    them and reducing again, so the bound holds for summaries built batch by
+    batch. ``extra`` columns (quantity, rows) are summed, never deducted.
+    Weights must be non-negative.
+    """
+    n_items = int(item.max(initial=0)) + 1
+    pairs, pair_keys = pd.factorize(group.astype(np.int64) * n_items + item)
+    amount = np.bincount(pairs, amount, len(pair_keys))
+    extra = {name: np.bincount(pairs, values, len(pair_keys)) for name, values in extra.items()}
+    pair_group, pair_item = np.divmod(pair_keys, n_items)
+
+    # Heaviest first within each group; rank is the position inside the group
+    order = np.lexsort((-amount, pair_group))
+    amount, sorted_group = amount[order], pair_group[order]
+    starts = np.flatnonzero(np.r_[True, sorted_group[1:] != sorted_group[:-1]])
+    rank = np.arange(len(order)) - np.repeat(starts, np.diff(np.r_[starts, len(order)]))
+    at_cut = rank == k
+    cut_group, cut_amount = sorted_group[at_cut], amount[at_cut]
+    deduct = pd.Series(cut_amount, index=cut_group).reindex(sorted_group, fill_value=0.0).to_numpy()
+
+    counters = amount - deduct
+    keep = (rank < k) & (counters > 0)
+    kept = order[keep]
+    return (
+        sorted_group[keep], pair_item[kept], counters[keep], {name: values[kept] for name, values in extra.items()},
+    ), (cut_group, cut_amount)
+
+
+# --- BUILD / MERGE ---
+def empty_sketches(precision=HLL_PRECISION, k=HEAVY_HITTERS):
+    """Sketches over no rows; ``update_sketches`` folds row batches into them."""
+    empty_keys = np.zeros(0, dtype=np.int64)
+    return {
+        'precision': precision,
+        'heavy_hitters': k,
+        'values': {dim: np.zeros(0, dtype=object) for dim in VOCABULARY_DIMS},
+        'hashes': {dim: np.zeros(0, dtype=np.uint64) for dim in DISTINCT_DIMS},
+        'day_keys': empty_keys,
+        'hll': {
+            dim: {'key': empty_keys, 'index': np.zeros(0, dtype=np.uint16), 'rank': np.zeros(0, dtype=np.uint8)}
+            for dim in DISTINCT_DIMS
+        },
+        'heavy': {
+            dim: {'key': empty_keys, 'category': empty_keys, 'item': empty_keys,
+                  'Amount': np.zeros(0), 'quantity': np.zeros(0), 'rows': np.zeros(0)}
+            for dim in HEAVY_DIMS
+        },
+        'deducted': {
+            dim: {'key': empty_keys, 'category': empty_keys, 'amount': np.zeros(0)}
+            for dim in HEAVY_DIMS
+        },
+    }
+
+
+def _vocabulary_ids(values, column):
+    # Ids are positions in the growing vocabulary, stable across batches
+    codes, uniques = pd.factorize(column)
+    positions = pd.Index(values).get_indexer(uniques)
+    new = positions < 0
+    positions[new] = len(values) + np.arange(np.count_nonzero(new))
+    return np.concatenate([values, np.asarray(uniques[new], dtype=object)]), positions[codes]
+
+
+def _day_keys(unit_ids, dates):
+    days = np.asarray(dates, dtype='datetime64[D]').astype(np.int64)
+    return unit_ids.astype(np.int64) * DAY_RANGE + days + DAY_OFFSET
+
+
+def _merge_registers(sketches, day_keys, ids, hashes):
+    # Sparse registers: the highest rank per (unit-day key, register index),
+    # sorted by key so a unit's date window is one searchsorted range
+    precision = sketches['precision']
+    registers = {}
+    for dim, old in sketches['hll'].items():
+        index, rank = hll_slots(hashes[dim], precision)
+        slots = np.concatenate([
+            (old['key'] << precision) + old['index'], (day_keys << precision) + index[ids[dim]],
+        ])
+        ranks = np.concatenate([old['rank'], rank[ids[dim]]])
+        order = np.argsort(slots, kind='stable')
+        slots, ranks = slots[order], ranks[order]
+        starts = np.flatnonzero(np.r_[True, slots[1:] != slots[:-1]])
+        slots = slots[starts]
+        registers[dim] = {
+            'key': slots >> precision,
+            'index': (slots & ((1 << precision) - 1)).astype(np.uint16),
+            'rank': np.maximum.reduceat(ranks, starts) if len(ranks) else ranks,
+        }
+    return registers
+
+
+def _merge_heavy(summary, deducted, merged_keys, rows, categories, items, batch, k):
+    # Groups are dense (unit, day) row * n_categories + category ids
+    n_categories = int(max(categories.max(initial=0), summary['category'].max(initial=0))) + 1
+
+    def groups(keys, category):
+        return np.searchsorted(merged_keys, keys) * n_categories + category
+
+    (group, item, amount, extra), (cut_group, cut_amount) = misra_gries(
+        np.concatenate([groups(summary['key'], summary['category']), rows * n_categories + categories]),
+        np.concatenate([summary['item'], items]),
+        np.concatenate([summary['Amount'], batch['Amount'].to_numpy(dtype=np.float64)]),
+        {
+            'quantity': np.concatenate([summary['quantity'], batch['quantity'].to_numpy(dtype=np.float64)]),
+            'rows': np.concatenate([summary['rows'], np.ones(len(batch))]),
+        },
+        k,
+    )
+    # Sorted by (unit, day) so a unit's date window is one searchsorted range
+    order = np.lexsort((item, group))
+    row, category = np.divmod(group[order], n_categories)
+    merged = {'key': merged_keys[row], 'category': category, 'item': item[order], 'Amount': amount[order],
+              **{name: values[order] for name, values in extra.items()}}
+
+    totals = pd.Series(np.concatenate([deducted['amount'], cut_amount])).groupby(
+        np.concatenate([groups(deducted['key'], deducted['category']), cut_group])
+    ).sum()
+    cut_row, cut_category = np.divmod(totals.index.to_numpy(dtype=np.int64), n_categories)
+    return merged, {'key': merged_keys[cut_row], 'category': cut_category, 'amount': totals.to_numpy()}
+
+
+def update_sketches(sketches, batch):
+    """New sketches that also cover the raw transaction rows of ``batch``; ``sketches`` is untouched.
+
+    Distinct counts merge HyperLogLog registers per (unit, day); heavy
+    hitters merge the batch into each (unit, day[, category]) Misra-Gries
+    summary. Only this batch and the summaries are in memory, so sketches
+    can be built from a stream of batches without the exact roll-ups.
+    """
+    if batch is None or not len(batch):
+        return sketches
+    values, ids = {}, {}
+    for dim in VOCABULARY_DIMS:
+        values[dim], ids[dim] = _vocabulary_ids(sketches['values'][dim], batch[dim])
+    hashes = {
+        dim: np.concatenate([old, hash_values(values[dim][len(old):])])
+        for dim, old in sketches['hashes'].items()
+    }
+    row_keys = _day_keys(ids[UNIT], batch[DATE].to_numpy())
+    day_codes, day_keys = pd.factorize(row_keys)
+    merged_keys = np.union1d(sketches['day_keys'], day_keys)
+    rows = np.searchsorted(merged_keys, day_keys)[day_codes]
+
+    heavy, deducted = {}, {}
+    for dim, by in HEAVY_DIMS.items():
+        categories = ids[by] if by is not None else np.zeros(len(batch), dtype=np.int64)
+        heavy[dim], deducted[dim] = _merge_heavy(
+            sketches['heavy'][dim], sketches['deducted'][dim], merged_keys, rows, categories, ids[dim], batch,
+            sketches['heavy_hitters'],
+        )
+    return {
+        **sketches, 'values': values, 'hashes': hashes, 'day_keys': merged_keys,
+        'hll': _merge_registers(sketches, row_keys, ids, hashes), 'heavy': heavy, 'deducted': deducted,
+    }
+
+
+def build_sketches(batches, precision=HLL_PRECISION, k=HEAVY_HITTERS):
+    """Sketches of raw transaction rows, folded in one batch (frame) at a time."""
+    sketches = empty_sketches(precision, k)
+    for batch in batches:
+        sketches = update_sketches(sketches, batch)
+    return sketches
+
+
+# --- QUERIES ---
+def sketch_info(sketches):
+    """JSON-safe description of the sketch settings and their error bounds."""
+    return {
+        'hll_precision': sketches['precision'],
+        'distinct_relative_error': hll_relative_error(sketches['precision']),
+        'heavy_hitters_per_day': sketches['heavy_hitters'],
+    }
+
+
+def _key_range(sketches, keys, unit, start, end):
+    # Positions [lo, hi) of one unit's (unit, day) keys within [start, end]
+    unit_id = pd.Index(sketches['values'][UNIT]).get_indexer([unit])[0]
+    if unit_id < 0:
+        return 0, 0
+    first = unit_id * DAY_RANGE
+    lo_key = first if start is None else _day_keys(np.array([unit_id]), np.array([start], dtype='datetime64[D]'))[0]
+    hi_key = first + DAY_RANGE - 1 if end is None else _day_keys(np.array([unit_id]), np.array([end], dtype='datetime64[D]'))[0]
+    return np.searchsorted(keys, lo_key, 'left'), np.searchsorted(keys, hi_key, 'right')
+
+
+def distinct_count(sketches, dim, units, start=None, end=None):
+    """Estimated distinct ``dim`` count for the unit(s) within [start, end]."""
+    if isinstance(units, str):
+        units = [units]
+    registers = sketches['hll'][dim]
+    merged = np.zeros(1 << sketches['precision'], dtype=np.uint8)
+    found = False
+    for unit in set(units):
+        lo, hi = _key_range(sketches, registers['key'], unit, start, end)
+        if hi > lo:
+            np.maximum.at(merged, registers['index'][lo:hi], registers['rank'][lo:hi])
+            found = True
+    return int(round(hll_count(merged))) if found else 0
+
+
+def distinct_error(sketches, estimate):
+    """Half-width of the ~95% interval (two standard errors) around ``estimate``."""
+    return int(math.ceil(2 * hll_relative_error(sketches['precision']) * estimate))
+
+
+def top_ranked(sketches, dim, unit, category=None, n=10, start=None, end=None):
+    """Top ``n`` values of ``dim`` by their guaranteed (lower-bound) Amount.
+
+    Columns match the exact top-K frames plus ``amount_bound``: the true
+    Amount is within ``[Amount, Amount + amount_bound]``, where the bound is
+    what the merged summaries deducted (at most the window's Amount divided
+    by ``k+1``). ``quantity`` and ``rows`` are summed while the item held a
+    counter, so they are lower bounds too.
+    """
+    columns = [dim, 'Amount', 'quantity', 'rows', 'amount_bound']
+    if category is not None and HEAVY_DIMS[dim] is None:
+        raise ValueError(f'{dim} summaries are not kept per category')
+    summary, deducted = sketches['heavy'][dim], sketches['deducted'][dim]
+    lo, hi = _key_range(sketches, summary['key'], unit, start, end)
+    cut_lo, cut_hi = _key_range(sketches, deducted['key'], unit, start, end)
+    kept = np.arange(lo, hi)
+    cut = np.arange(cut_lo, cut_hi)
+    if category is not None:
+        category_id = pd.Index(sketches['values'][HEAVY_DIMS[dim]]).get_indexer([category])[0]
+        kept = kept[summary['category'][kept] == category_id]
+        cut = cut[deducted['category'][cut] == category_id]
+    if not len(kept):
+        return pd.DataFrame(columns=columns)
+
+    items, positions = np.unique(summary['item'][kept], return_inverse=True)
+    names = sketches['values'][dim][items]
+    amount = np.bincount(positions, summary['Amount'][kept], len(items))
+    # Equal Amounts keep name order, like the exact index
+    ranked = np.lexsort((names.astype(str), -amount))[:n]
+    return pd.DataFrame({
+        dim: names[ranked],
+        'Amount': amount[ranked],
+        'quantity': np.bincount(positions, summary['quantity'][kept], len(items))[ranked],
+        'rows': np.bincount(positions, summary['rows'][kept], len(items))[ranked].astype(np.int64),
+        'amount_bound': float(deducted['amount'][cut].sum()),
+    })
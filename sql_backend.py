@@ -0,0 +1,129 @@
+import pandas as pd
+
+try:
+    import duckdb
+except ImportError:  # optional: only needed for DASHBOARD_BACKEND=duckdb
+    duckdb = None
+
+from cube import CATEGORY, DATE, MEASURES, TOPK_DEPTH, UNIT
+
+# Same measures as the cube; kahan_sum matches the compensated sums pandas uses
+_MEASURES_SQL = 'kahan_sum("Amount") AS "Amount", kahan_sum("quantity") AS "quantity", count(*) AS "rows"'
+
+
+def _q(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _literal(value):
+    return "'" + value.replace("'", "''") + "'"
+
+
+class SqlCube:
+    """DuckDB view over the dataset's Parquet files, queried in place.
+
+    Stands in for the cube dict: the module-level functions below mirror the
+    cube's query primitives, so every chart in ``aggregations.py`` runs on
+    either backend. Nothing is loaded into pandas except query results, so
+    the dataset may be larger than RAM; DuckDB scans the files with its own
+    thread pool.
+    """
+
+    def __init__(self, paths, threads=None):
+        if duckdb is None:
+            raise ImportError('the DuckDB backend requires duckdb (pip install duckdb)')
+        self.paths = list(paths)
+        self.token = object()
+        self._con = duckdb.connect()
+        if threads:
+            self._con.execute(f'SET threads = {int(threads)}')
+        files = ', '.join(_literal(path) for path in self.paths)
+        self._con.execute(f'CREATE VIEW transactions AS SELECT * FROM read_parquet([{files}], union_by_name = true)')
+
+    def execute(self, sql, params=()):
+        # One cursor per query: a DuckDB connection must not be shared across threads
+        return self._con.cursor().execute(sql, list(params)).df()
+
+
+def _where(units, category=None, start=None, end=None):
+    if isinstance(units, str):
+        units = [units]
+    units = sorted(set(units))
+    clauses = [f'{_q(UNIT)} IN ({", ".join("?" * len(units))})' if units else 'false']
+    params = list(units)
+    if category is not None:
+        clauses.append(f'{_q(CATEGORY)} = ?')
+        params.append(category)
+    if start is not None:
+        clauses.append(f'{_q(DATE)} >= ?')
+        params.append(pd.Timestamp(start))
+    if end is not None:
+        clauses.append(f'{_q(DATE)} <= ?')
+        params.append(pd.Timestamp(end))
+    return ' AND '.join(clauses), params
+
+
+def _grouped(cube, by, units, category=None, start=None, end=None, order=None, limit=None):
+    where, params = _where(units, category, start, end)
+    cols = ', '.join(_q(col) for col in by)
+    sql = f'SELECT {cols}, {_MEASURES_SQL} FROM transactions WHERE {where} GROUP BY {cols} ORDER BY {order or cols}'
+    if limit is not None:
+        sql += f' LIMIT {int(limit)}'
+    return cube.execute(sql, params)
+
+
+def _totals(cube, units, category=None, start=None, end=None):
+    where, params = _where(units, category, start, end)
+    row = cube.execute(f'SELECT {_MEASURES_SQL} FROM transactions WHERE {where}', params).iloc[0]
+    return row.fillna(0)
+
+
+# --- CUBE PRIMITIVES ---
+def query(cube, by, units, category=None):
+    """SQL counterpart of ``cube.query``."""
+    if not by:
+        return _totals(cube, units, category)
+    return _grouped(cube, by, units, category)
+
+
+def window_totals(cube, units, start=None, end=None):
+    """SQL counterpart of ``cube.window_totals``."""
+    totals = _totals(cube, units, start=start, end=end)
+    return {m: totals[m] for m in MEASURES}
+
+
+def window_rows(cube, units, start=None, end=None):
+    """SQL counterpart of ``cube.window_rows``: one row per (unit, date)."""
+    return _grouped(cube, [UNIT, DATE], units, start=start, end=end)
+
+
+def window_distinct_count(cube, dim, units, start=None, end=None):
+    """SQL counterpart of ``cube.window_distinct_count``."""
+    where, params = _where(units, start=start, end=end)
+    return int(cube.execute(f'SELECT count(DISTINCT {_q(dim)}) AS n FROM transactions WHERE {where}', params)['n'][0])
+
+
+def distinct_count(cube, dim, units):
+    """SQL counterpart of ``cube.distinct_count``."""
+    return window_distinct_count(cube, dim, units)
+
+
+def top_ranked(cube, dim, unit, category=None, n=TOPK_DEPTH):
+    """SQL counterpart of ``cube.top_ranked``; ties keep name order like the index."""
+    return _grouped(cube, [dim], unit, category, order=f'"Amount" DESC, {_q(dim)}', limit=n)
+
+
+def approximation(cube):
+    """Always None: the SQL backend answers exactly (sketches are built with the pandas cube)."""
+    return None
+
+
+def date_span(cube):
+    """First and last transaction date, as ``datetime.date``."""
+    span = cube.execute(f'SELECT min({_q(DATE)}) AS lo, max({_q(DATE)}) AS hi FROM transactions').iloc[0]
+    return span['lo'].date(), span['hi'].date()
+
+
+def unit_values(cube):
+    """Every Quantity unit in the data, sorted."""
+    return sorted(cube.execute(f'SELECT DISTINCT {_q(UNIT)} AS u FROM transactions')['u'])
@@ -0,0 +1,52 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data_store import normalize_transactions  # noqa: E402
+
+UNITS = ['Kilograms', 'Meters', 'Pieces', 'Rolls', 'Sets']
+SUPPLIERS = [f'Supplier {i:02d}' for i in range(30)]
+CATEGORIES = [f'Category {i}' for i in range(4)]
+PRODUCTS = [f'Product {i:02d}' for i in range(40)]
+
+
+def raw_transactions(rows, seed):
+    """Raw transaction rows over a few units, suppliers, products and about a year of days.
+
+    Units and suppliers are skewed, so some suppliers trade on only a handful
+    of days and the top-K and zero-fill paths all get exercised.
+    """
+    rng = np.random.default_rng(seed)
+    product = rng.integers(0, len(PRODUCTS), rows)
+    supplier_weights = 1.0 / np.arange(1, len(SUPPLIERS) + 1)
+    return pd.DataFrame({
+        'Transaction Date': pd.Timestamp('2024-01-01') + pd.to_timedelta(rng.integers(0, 400, rows), unit='D'),
+        'Quantity unit': rng.choice(UNITS, rows, p=[0.4, 0.25, 0.2, 0.1, 0.05]),
+        'Supplier': rng.choice(SUPPLIERS, rows, p=supplier_weights / supplier_weights.sum()),
+        'standardized_name': np.array(PRODUCTS)[product],
+        'category_group': np.array(CATEGORIES)[product % len(CATEGORIES)],
+        'Amount': rng.lognormal(7, 1.5, rows),
+        'quantity': rng.integers(1, 500, rows).astype(float),
+    })
+
+
+@pytest.fixture(scope='session')
+def make_transactions():
+    return raw_transactions
+
+
+@pytest.fixture(scope='session')
+def raw_rows():
+    """The raw rows behind ``transactions``."""
+    return raw_transactions(3_000, seed=7)
+
+
+@pytest.fixture(scope='session')
+def transactions(raw_rows):
+    """Normalized transactions shared by every test; treat them as read-only."""
+    return normalize_transactions(raw_rows.copy())
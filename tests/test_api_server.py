@@ -0,0 +1,137 @@
+import gzip
+import json
+import threading
+import types
+from http.client import HTTPConnection
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+import api_server
+from aggregations import LRUCache, top_suppliers
+from api_server import ApiHandler, BadRequest, cached_response, daily_trend_endpoint, top_suppliers_endpoint
+from cube import build_cube
+
+
+@pytest.fixture(scope='module')
+def cube(transactions):
+    return build_cube(transactions)
+
+
+@pytest.fixture
+def unit(transactions):
+    return str(transactions['Quantity unit'].value_counts().index[0])
+
+
+@pytest.fixture(autouse=True)
+def fresh_response_cache(monkeypatch):
+    monkeypatch.setattr(api_server, 'response_cache', LRUCache(max_entries=64, max_bytes=10**8))
+
+
+# --- PARAMETER VALIDATION ---
+@pytest.mark.parametrize('n', ['0', '-3', 'four', '2.5'])
+def test_top_suppliers_rejects_bad_n(cube, unit, n):
+    with pytest.raises(BadRequest, match="'n'"):
+        top_suppliers_endpoint(cube, {'unit': [unit], 'n': [n]})
+
+
+def test_top_suppliers_returns_rank_order(cube, unit):
+    result = top_suppliers_endpoint(cube, {'unit': [unit], 'n': ['2']})
+    expected = top_suppliers(cube, unit, 2)
+    assert result['supplier'] == list(expected['Supplier'])
+    assert result['amount'] == list(expected['Amount'])
+
+
+def test_daily_trend_smooth_accepts_zero_and_rejects_negatives(cube, unit):
+    raw = daily_trend_endpoint(cube, {'unit': [unit]})
+    assert daily_trend_endpoint(cube, {'unit': [unit], 'smooth': ['0']}) == raw
+    assert daily_trend_endpoint(cube, {'unit': [unit], 'smooth': ['7']}) != raw
+    with pytest.raises(BadRequest, match="'smooth' must be at least 0"):
+        daily_trend_endpoint(cube, {'unit': [unit], 'smooth': ['-1']})
+
+
+@pytest.mark.parametrize('path, params, message', [
+    ('/api/top_suppliers', {}, "'unit' is required"),
+    ('/api/stats', {'start': ['2024-13-01']}, "'start' must be YYYY-MM-DD"),
+    ('/api/category_split', {'mode': ['Weight']}, "'mode' must be Amount or Volume"),
+    ('/api/supplier_trend', {'freq': ['Hourly']}, "'freq' must be one of"),
+])
+def test_endpoints_reject_bad_parameters(cube, unit, path, params, message):
+    params = {'unit': [unit], **params} if path != '/api/top_suppliers' else params
+    with pytest.raises(BadRequest, match=message):
+        api_server.ENDPOINTS[path](cube, params)
+
+
+# --- RESPONSE CACHE ---
+def test_cached_response_is_keyed_on_query_and_dataset(cube, transactions, unit):
+    first = cached_response(cube, '/api/top_suppliers', {'unit': [unit]})
+    assert cached_response(cube, '/api/top_suppliers', {'unit': [unit]}) is first
+    assert cached_response(cube, '/api/top_suppliers', {'unit': [unit], 'n': ['2']}) is not first
+    rebuilt = cached_response(build_cube(transactions), '/api/top_suppliers', {'unit': [unit]})
+    assert rebuilt is not first and rebuilt[1] == first[1]
+
+
+# --- HTTP HANDLER ---
+@pytest.fixture
+def get(monkeypatch, cube):
+    monkeypatch.setattr(ApiHandler, 'live', types.SimpleNamespace(snapshot=lambda: {'cube': cube}))
+    monkeypatch.setattr(ApiHandler, 'log_message', lambda *args: None)
+    server = ThreadingHTTPServer(('127.0.0.1', 0), ApiHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    def request(path, **headers):
+        connection = HTTPConnection('127.0.0.1', server.server_port, timeout=10)
+        connection.request('GET', path, headers={key.replace('_', '-'): value for key, value in headers.items()})
+        response = connection.getresponse()
+        body = response.read()
+        connection.close()
+        return response, body
+
+    yield request
+    server.shutdown()
+    server.server_close()
+
+
+def test_etag_answers_304(get, unit):
+    response, body = get(f'/api/daily_trend?unit={unit}')
+    assert response.status == 200
+    etag = response.getheader('ETag')
+    assert etag.startswith('W/"')
+    assert 'max-age=' in response.getheader('Cache-Control')
+
+    response, body = get(f'/api/daily_trend?unit={unit}', If_None_Match=f'"other", {etag}')
+    assert response.status == 304
+    assert body == b''
+    assert response.getheader('ETag') == etag
+
+
+def test_encoding_follows_accept_encoding(get, unit):
+    path = f'/api/daily_trend?unit={unit}'
+    _, plain = get(path)
+    assert json.loads(plain)['dates']
+
+    response, body = get(path, Accept_Encoding='gzip')
+    assert response.getheader('Content-Encoding') == 'gzip'
+    assert response.getheader('Vary') == 'Accept-Encoding'
+    assert gzip.decompress(body) == plain
+
+    brotli = pytest.importorskip('brotli')
+    response, body = get(path, Accept_Encoding='gzip, br;q=0.9')
+    assert response.getheader('Content-Encoding') == 'br'
+    assert brotli.decompress(body) == plain
+
+
+def test_small_responses_are_not_compressed(get, unit):
+    response, body = get(f'/api/top_suppliers?unit={unit}&n=1', Accept_Encoding='gzip, br')
+    assert response.status == 200
+    assert response.getheader('Content-Encoding') is None
+    assert len(body) < api_server.COMPRESS_MIN_BYTES
+
+
+def test_errors_are_json(get, unit):
+    response, body = get(f'/api/top_suppliers?unit={unit}&n=0')
+    assert response.status == 400
+    assert json.loads(body) == {'error': "'n' must be at least 1, got 0"}
+    response, body = get('/api/nothing')
+    assert response.status == 404
@@ -0,0 +1,218 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import sketches
+from cube import (
+    BASE_GRAIN, CATEGORY, DATE, MEASURES, PRODUCT, ROLLUPS, SUPPLIER, TOPK_DEPTH, UNIT,
+    build_cube, date_span, distinct_count, query, top_ranked, update_cube,
+    window_distinct_count, window_rows, window_totals,
+)
+from data_store import normalize_transactions
+
+
+@pytest.fixture(scope='module')
+def cube(transactions):
+    return build_cube(transactions)
+
+
+def raw_sums(df, by):
+    return (
+        df.groupby(by, observed=True)
+        .agg(Amount=('Amount', 'sum'), quantity=('quantity', 'sum'), rows=('Amount', 'size'))
+        .reset_index()
+    )
+
+
+def assert_same_sums(actual, expected, by):
+    def normalized(frame):
+        frame = frame[by + MEASURES].copy()
+        for col in by:
+            if isinstance(frame[col].dtype, pd.CategoricalDtype):
+                frame[col] = frame[col].astype(str)
+        return frame.sort_values(by).reset_index(drop=True)
+
+    pd.testing.assert_frame_equal(normalized(actual), normalized(expected), check_dtype=False)
+
+
+def some_units(df):
+    counts = df[UNIT].value_counts()
+    return [counts.index[0]], list(counts.index[1:4]), list(counts.index)
+
+
+# --- ROLL-UP PARITY ---
+@pytest.mark.parametrize('name', ['base', *ROLLUPS])
+def test_rollups_match_raw_groupby(cube, transactions, name):
+    dims = BASE_GRAIN if name == 'base' else ROLLUPS[name]
+    assert_same_sums(cube['rollups'][name], raw_sums(transactions, dims), dims)
+
+
+@pytest.mark.parametrize('by', [[SUPPLIER], [CATEGORY], [DATE], [SUPPLIER, DATE], ['standardized_name']])
+def test_query_matches_filtered_groupby(cube, transactions, by):
+    for units in some_units(transactions):
+        rows = transactions[transactions[UNIT].isin(units)]
+        assert_same_sums(query(cube, by, units), raw_sums(rows, by), by)
+
+
+def test_query_with_category_matches_filtered_groupby(cube, transactions):
+    unit = transactions[UNIT].value_counts().index[0]
+    rows = transactions[transactions[UNIT] == unit]
+    category = rows[CATEGORY].value_counts().index[0]
+    rows = rows[rows[CATEGORY] == category]
+    assert_same_sums(query(cube, [SUPPLIER], unit, category=category), raw_sums(rows, [SUPPLIER]), [SUPPLIER])
+
+
+def test_query_without_dimensions_returns_totals(cube, transactions):
+    units = some_units(transactions)[1]
+    rows = transactions[transactions[UNIT].isin(units)]
+    totals = query(cube, [], units)
+    assert totals['Amount'] == pytest.approx(rows['Amount'].sum())
+    assert totals['quantity'] == pytest.approx(rows['quantity'].sum())
+    assert totals['rows'] == len(rows)
+
+
+# --- DATE WINDOWS ---
+def windows(df):
+    first, last = df[DATE].min(), df[DATE].max()
+    middle = first + (last - first) / 2
+    return [
+        (None, None),
+        (first, None),
+        (None, middle),
+        (middle, last),
+        (middle, middle),
+        (last + pd.Timedelta(days=1), None),
+    ]
+
+
+def in_window(df, start, end):
+    mask = pd.Series(True, index=df.index)
+    if start is not None:
+        mask &= df[DATE] >= start
+    if end is not None:
+        mask &= df[DATE] <= end
+    return df[mask]
+
+
+def test_window_totals_match_masked_sum(cube, transactions):
+    for units in some_units(transactions):
+        selected = transactions[transactions[UNIT].isin(units)]
+        for start, end in windows(transactions):
+            rows = in_window(selected, start, end)
+            totals = window_totals(cube, units, start, end)
+            assert totals['Amount'] == pytest.approx(rows['Amount'].sum())
+            assert totals['quantity'] == pytest.approx(rows['quantity'].sum())
+            assert totals['rows'] == len(rows)
+
+
+def test_window_rows_and_distinct_count_match_masked_rows(cube, transactions):
+    for units in some_units(transactions):
+        selected = transactions[transactions[UNIT].isin(units)]
+        for start, end in windows(transactions):
+            rows = in_window(selected, start, end)
+            assert_same_sums(window_rows(cube, units, start, end), raw_sums(rows, [UNIT, DATE]), [UNIT, DATE])
+            assert window_distinct_count(cube, SUPPLIER, units, start, end) == rows[SUPPLIER].nunique()
+
+
+def test_date_span_covers_the_rows(cube, transactions):
+    assert date_span(cube) == (transactions[DATE].min().date(), transactions[DATE].max().date())
+
+
+# --- TOP-K INDEX ---
+@pytest.mark.parametrize('dim', [SUPPLIER, PRODUCT])
+@pytest.mark.parametrize('n', [3, TOPK_DEPTH, TOPK_DEPTH + 5])
+def test_top_ranked_matches_groupby_nlargest(cube, transactions, dim, n):
+    unit = transactions[UNIT].value_counts().index[0]
+    rows = transactions[transactions[UNIT] == unit]
+    category = rows[CATEGORY].value_counts().index[0]
+    for category, subset in [(None, rows), (category, rows[rows[CATEGORY] == category])]:
+        expected = raw_sums(subset, [dim]).nlargest(n, 'Amount')
+        ranked = top_ranked(cube, dim, unit, category, n)
+        assert list(ranked[dim].astype(str)) == list(expected[dim].astype(str))
+        assert ranked['Amount'].to_numpy() == pytest.approx(expected['Amount'].to_numpy())
+        assert list(ranked['rows']) == list(expected['rows'])
+
+
+def test_top_ranked_is_empty_for_an_unknown_unit(cube):
+    assert top_ranked(cube, SUPPLIER, 'no such unit').empty
+
+
+# --- INCREMENTAL UPDATE ---
+def units_of(cube):
+    return sorted(cube['unit_index']['unit_date'])
+
+
+@pytest.fixture(scope='module')
+def new_raw(make_transactions):
+    # A later batch that also brings a unit and a supplier the cube has not seen
+    raw = make_transactions(1_000, seed=11)
+    raw.loc[raw.index[-50:], UNIT] = 'Barrels'
+    raw.loc[raw.index[-80:], SUPPLIER] = 'Supplier NEW'
+    return raw
+
+
+@pytest.fixture(scope='module')
+def new_rows(new_raw):
+    return normalize_transactions(new_raw.copy())
+
+
+@pytest.fixture(scope='module')
+def all_rows(raw_rows, new_raw):
+    # What a full rebuild loads: the original rows and the new ones together
+    return normalize_transactions(pd.concat([raw_rows, new_raw], ignore_index=True))
+
+
+def test_update_cube_matches_build_cube_on_concatenated_rows(cube, new_rows, all_rows):
+    updated = update_cube(cube, new_rows)
+    rebuilt = build_cube(all_rows)
+
+    assert updated['rollups'].keys() == rebuilt['rollups'].keys()
+    for name, frame in rebuilt['rollups'].items():
+        dims = BASE_GRAIN if name == 'base' else ROLLUPS[name]
+        assert_same_sums(updated['rollups'][name], frame, dims)
+    assert units_of(updated) == units_of(rebuilt)
+    units = units_of(rebuilt)
+    for selection in [units[:1], units[1:4], ['Barrels'], units]:
+        assert distinct_count(updated, SUPPLIER, selection) == distinct_count(rebuilt, SUPPLIER, selection)
+        assert window_totals(updated, selection) == pytest.approx(window_totals(rebuilt, selection))
+    for dim in (SUPPLIER, PRODUCT):
+        assert updated['topk'][dim].keys() == rebuilt['topk'][dim].keys()
+        for key, ranked in rebuilt['topk'][dim].items():
+            assert list(updated['topk'][dim][key][dim].astype(str)) == list(ranked[dim].astype(str))
+
+
+def test_update_cube_leaves_the_original_cube_untouched(cube, new_rows):
+    before = {name: frame.copy() for name, frame in cube['rollups'].items()}
+    update_cube(cube, new_rows)
+    assert 'Barrels' not in units_of(cube)
+    for name, frame in before.items():
+        pd.testing.assert_frame_equal(cube['rollups'][name], frame)
+
+def test_update_cube_merges_distinct_sketches(transactions, new_rows, all_rows):
+    updated = update_cube(build_cube(transactions, approximate=True), new_rows)
+    rebuilt = build_cube(all_rows, approximate=True)
+    for selection in [['Barrels'], units_of(rebuilt)]:
+        assert (
+            sketches.distinct_count(updated['sketches'], SUPPLIER, selection)
+            == sketches.distinct_count(rebuilt['sketches'], SUPPLIER, selection)
+        )
+
+
+def test_sparse_registers_match_dense_registers_of_the_raw_rows(transactions):
+    built = sketches.build_sketches([transactions])
+    units = list(transactions[UNIT].astype(str).unique()[:2])
+    start, end = pd.Timestamp('2024-03-01'), pd.Timestamp('2024-05-31')
+    rows = transactions[transactions[UNIT].astype(str).isin(units) & transactions[DATE].between(start, end)]
+    for dim in sketches.DISTINCT_DIMS:
+        index, rank = sketches.hll_slots(sketches.hash_values(rows[dim].astype(str).unique()), built['precision'])
+        registers = np.zeros(1 << built['precision'], dtype=np.uint8)
+        np.maximum.at(registers, index, rank)
+        assert sketches.distinct_count(built, dim, units, start, end) == int(round(sketches.hll_count(registers)))
+
+
+def test_sparse_registers_do_not_depend_on_batching(transactions):
+    whole = sketches.build_sketches([transactions])
+    batched = sketches.build_sketches([transactions.iloc[i:i + 700] for i in range(0, len(transactions), 700)])
+    for dim in sketches.DISTINCT_DIMS:
+        for part in ('key', 'index', 'rank'):
+            np.testing.assert_array_equal(whole['hll'][dim][part], batched['hll'][dim][part])
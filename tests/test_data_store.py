@@ -0,0 +1,56 @@
+import openpyxl
+import pandas as pd
+import pytest
+
+from data_store import append_to_store, ensure_cache, iter_transaction_batches, read_store
+
+# Two rows per batch: Incoterms is empty in the first batch only, and Buyer
+# Tel holds digits in the first batch and text in the second
+ROWS = [
+    ['2024-01-02', 'Kilograms', 'Supplier A', 'Product 1', 'Category 1', 100.0, 1.0, 1, None, 2746251446],
+    ['2024-01-03', 'Kilograms', 'Supplier B', 'Product 2', 'Category 1', 200.0, 2.0, 2, None, 2746251447],
+    ['2024-02-04', 'Meters', 'Supplier A', 'Product 1', 'Category 1', 300.0, 3.0, 3, 'CIF', 'ask reception'],
+    ['2024-02-05', 'Meters', 'Supplier C', 'Product 3', 'Category 2', 400.0, 4.0, 4, 'FOB', '0274 625 1448'],
+]
+COLUMNS = [
+    'Transaction Date', 'Quantity unit', 'Supplier', 'standardized_name', 'category_group',
+    'Amount', 'quantity', 'bill_id', 'Incoterms', 'Buyer Tel',
+]
+
+
+@pytest.fixture(params=['csv', 'xlsx'])
+def source(request, tmp_path):
+    path = str(tmp_path / f'extract.{request.param}')
+    if request.param == 'csv':
+        pd.DataFrame(ROWS, columns=COLUMNS).to_csv(path, index=False)
+    else:
+        workbook = openpyxl.Workbook()
+        sheet = workbook.active
+        sheet.append(COLUMNS)
+        for row in ROWS:
+            sheet.append(row)
+        workbook.save(path)
+    return path
+
+
+def assert_text_columns(df):
+    df = df.sort_values('bill_id').reset_index(drop=True)
+    assert list(df['Incoterms'].fillna('-')) == ['-', '-', 'CIF', 'FOB']
+    assert list(df['Buyer Tel']) == ['2746251446', '2746251447', 'ask reception', '0274 625 1448']
+    assert df['Amount'].sum() == 1000.0
+
+
+# --- STREAMED PARQUET ---
+def test_cache_keeps_columns_whose_type_changes_between_batches(source, tmp_path):
+    path = ensure_cache(source, str(tmp_path / 'cache'), batch_rows=2)
+    assert_text_columns(pd.read_parquet(path))
+
+
+def test_append_keeps_columns_whose_type_changes_between_batches(source, tmp_path):
+    store_dir = str(tmp_path / 'store')
+    entry = append_to_store(iter_transaction_batches(source, batch_rows=2), source, store_dir)
+    assert entry['rows'] == 4
+    assert_text_columns(read_store(store_dir))
+
+    # Keys read back from the store match the incoming rows' keys
+    assert append_to_store(iter_transaction_batches(source, batch_rows=2), source, store_dir) is None
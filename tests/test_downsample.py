@@ -0,0 +1,66 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from downsample import downsample, lttb_indices, minmax_indices
+
+
+@pytest.fixture(scope='module')
+def series():
+    rng = np.random.default_rng(3)
+    x = pd.date_range('2023-01-01', periods=5_000, freq='D')
+    y = np.cumsum(rng.normal(0, 1, len(x))) + 10 * np.sin(np.arange(len(x)) / 50)
+    return pd.Series(x), pd.Series(y)
+
+
+@pytest.mark.parametrize('method', ['lttb', 'minmax'])
+@pytest.mark.parametrize('budget', [3, 4, 101, 1_000, 4_999])
+def test_indices_keep_endpoints_within_budget_in_order(series, method, budget):
+    x, y = series
+    indices = lttb_indices(x, y, budget) if method == 'lttb' else minmax_indices(y, budget)
+    assert indices[0] == 0
+    assert indices[-1] == len(x) - 1
+    assert len(indices) <= budget
+    assert (np.diff(indices) > 0).all()
+
+
+@pytest.mark.parametrize('method', ['lttb', 'minmax'])
+def test_downsample_returns_matching_points(series, method):
+    x, y = series
+    small_x, small_y = downsample(x, y, 500, method)
+    assert len(small_x) == len(small_y) <= 500
+    assert small_x.iloc[0] == x.iloc[0] and small_x.iloc[-1] == x.iloc[-1]
+    # Every kept point is an original (x, y) pair
+    pd.testing.assert_series_equal(small_y, y.loc[small_x.index])
+    assert small_x.is_monotonic_increasing
+
+
+@pytest.mark.parametrize('budget', [None, 0, 5_000, 10_000])
+def test_series_within_budget_come_back_unchanged(series, budget):
+    x, y = series
+    small_x, small_y = downsample(x, y, budget)
+    assert small_x is x and small_y is y
+
+
+def test_downsample_keeps_an_index_as_an_index(series):
+    x, y = series
+    small_x, _ = downsample(pd.DatetimeIndex(x), y.to_numpy(), 100)
+    assert isinstance(small_x, pd.DatetimeIndex) and len(small_x) <= 100
+
+
+def test_minmax_keeps_each_buckets_extremes():
+    # 102 points: the two endpoints plus min and max of 50 buckets of 20
+    y = np.zeros(1_000)
+    highs = np.arange(0, 1_000, 20) + 5
+    lows = np.arange(0, 1_000, 20) + 13
+    y[highs] = np.arange(1, 51)
+    y[lows] = -np.arange(1, 51)
+    indices = minmax_indices(y, 102)
+    assert set(highs) <= set(indices) and set(lows) <= set(indices)
+    assert len(indices) <= 102
+
+
+def test_lttb_keeps_isolated_spikes():
+    y = np.zeros(1_000)
+    y[[250, 700]] = [100, -100]
+    assert {250, 700} <= set(lttb_indices(np.arange(1_000), y, 50))
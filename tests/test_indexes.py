@@ -0,0 +1,41 @@
+import pytest
+
+from cube import UNIT, build_cube
+from indexes import build_bitsets, build_unit_index, count_distinct, distinct_values, take_units
+
+
+@pytest.fixture(scope='module')
+def base(transactions):
+    return build_cube(transactions)['rollups']['base']
+
+
+# --- UNIT RANGE INDEX ---
+def test_take_units_matches_isin_filter(base):
+    index = build_unit_index(base)
+    units = list(index)
+    selections = [units[:1], units[1:2] + units[-1:], units[::2], units, units[:2] + ['no such unit'], []]
+    for selection in selections:
+        expected = base[base[UNIT].isin(selection)]
+        assert take_units(base, index, selection).equals(expected)
+
+
+def test_take_units_accepts_a_single_unit_name(base):
+    index = build_unit_index(base)
+    unit = list(index)[-1]
+    assert take_units(base, index, unit).equals(base[base[UNIT] == unit])
+
+
+def test_unit_index_rejects_frame_not_sorted_by_unit(base):
+    with pytest.raises(ValueError):
+        build_unit_index(base.iloc[::-1])
+
+
+# --- DISTINCT-MEMBERSHIP BITSETS ---
+@pytest.mark.parametrize('dim', ['Supplier', 'standardized_name'])
+def test_bitsets_match_nunique(base, dim):
+    bitsets = build_bitsets(base, dim)
+    units = list(bitsets['rows'])
+    for selection in [units[:1], units[1:4], units[::3], units, []]:
+        rows = base[base[UNIT].isin(selection)]
+        assert count_distinct(bitsets, selection) == rows[dim].nunique()
+        assert set(distinct_values(bitsets, selection)) == set(rows[dim].unique())
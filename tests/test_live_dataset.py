@@ -0,0 +1,79 @@
+import pytest
+
+from aggregations import stats_totals, unit_values
+from data_store import append_to_store, coerce_transactions
+from live_dataset import LiveDataset
+
+
+@pytest.fixture(params=['pandas', 'duckdb'])
+def backend(request):
+    if request.param == 'duckdb':
+        pytest.importorskip('duckdb')
+    return request.param
+
+
+@pytest.fixture
+def append_batch(tmp_path, make_transactions):
+    store_dir = str(tmp_path / 'store')
+
+    def append(rows, seed):
+        batch = make_transactions(rows, seed)
+        batch['bill_id'] = [f'{seed}-{i}' for i in range(rows)]
+        return append_to_store([coerce_transactions(batch)], f'extract-{seed}.csv', store_dir)['rows']
+
+    append.store_dir = store_dir
+    return append
+
+
+def transactions_in(snapshot):
+    cube = snapshot['cube']
+    return stats_totals(cube, unit_values(cube))['transactions']
+
+
+def test_snapshot_stops_at_the_batch_its_signature_recorded(monkeypatch, tmp_path, backend, append_batch):
+    first = append_batch(300, seed=1)
+    signature = LiveDataset._signature
+    second = []
+
+    def racing_signature(self):
+        # A batch lands between reading the signature and opening the data
+        result = signature(self)
+        if not second:
+            second.append(append_batch(200, seed=2))
+        return result
+
+    monkeypatch.setattr(LiveDataset, '_signature', racing_signature)
+    live = LiveDataset(backend, source=str(tmp_path / 'missing.xlsx'), store_dir=append_batch.store_dir, poll_seconds=0)
+    snapshot = live.snapshot()
+    assert snapshot['signature'] == ('store', 1)
+    assert transactions_in(snapshot) == first
+
+    # The next check picks the racing batch up exactly once
+    assert live.check()
+    snapshot = live.snapshot()
+    assert snapshot['signature'] == ('store', 2)
+    assert snapshot['version'] == 2
+    assert transactions_in(snapshot) == first + second[0]
+    assert not live.check()
+
+
+def test_new_store_batches_update_the_cube_in_place_of_a_rebuild(monkeypatch, tmp_path, append_batch):
+    append_batch(300, seed=1)
+    live = LiveDataset('pandas', source=str(tmp_path / 'missing.xlsx'), store_dir=append_batch.store_dir, poll_seconds=0)
+    before = live.snapshot()
+    append_batch(200, seed=2)
+    with monkeypatch.context() as patch:
+        patch.setattr('live_dataset.build_cube', lambda *args: pytest.fail('rebuilt the whole cube'))
+        assert live.check()
+    after = live.snapshot()
+
+    # The old snapshot is untouched, and the new cube matches a fresh load
+    assert transactions_in(before) == 300
+    assert transactions_in(after) == 500
+    fresh = LiveDataset('pandas', source=str(tmp_path / 'missing.xlsx'), store_dir=append_batch.store_dir, poll_seconds=0)
+    units = unit_values(fresh.snapshot()['cube'])
+    assert unit_values(after['cube']) == units
+    for unit in units:
+        expected = stats_totals(fresh.snapshot()['cube'], [unit])
+        actual = stats_totals(after['cube'], [unit])
+        assert actual == pytest.approx(expected)
@@ -0,0 +1,98 @@
+import datetime
+
+import pandas as pd
+import pytest
+
+import aggregations
+from cube import build_cube
+from data_store import DIMENSION_COLUMNS
+
+pytest.importorskip('duckdb')
+from sql_backend import SqlCube  # noqa: E402
+
+
+@pytest.fixture(scope='module')
+def cubes(transactions, tmp_path_factory):
+    path = tmp_path_factory.mktemp('sql') / 'transactions.parquet'
+    # Stored as the cache stores them: dimensions as strings
+    transactions.astype({col: str for col in DIMENSION_COLUMNS}).to_parquet(path, index=False)
+    return build_cube(transactions), SqlCube([str(path)])
+
+
+def normalized(value):
+    if isinstance(value, pd.DataFrame):
+        frame = value.copy()
+        for col in frame.columns:
+            if isinstance(frame[col].dtype, pd.CategoricalDtype) or frame[col].dtype == object:
+                frame[col] = frame[col].astype(str)
+        frame.columns = [str(col) for col in frame.columns]
+        return frame.reset_index(drop=not isinstance(frame.index, pd.DatetimeIndex))
+    return value
+
+
+def assert_same(pandas_result, sql_result):
+    expected, actual = normalized(pandas_result), normalized(sql_result)
+    if isinstance(expected, pd.DataFrame):
+        pd.testing.assert_frame_equal(actual, expected, check_dtype=False, check_index_type=False, rtol=1e-9)
+    elif isinstance(expected, dict):
+        assert actual.keys() == expected.keys()
+        for key, value in expected.items():
+            assert actual[key] == (None if value is None else pytest.approx(value, rel=1e-9)), key
+    else:
+        assert actual == expected
+
+
+def windows(cube):
+    first, last = aggregations.date_span(cube)
+    middle = first + (last - first) / 2
+    return [(None, None), (first, middle), (middle, last), (middle + datetime.timedelta(days=30), last)]
+
+
+def unit_selections(cube):
+    units = aggregations.unit_values(cube)
+    return [units[:1], units[1:3], units]
+
+
+# --- CHART PARITY ---
+def test_dataset_span_and_units_match(cubes):
+    pandas_cube, sql_cube = cubes
+    assert_same(aggregations.date_span(pandas_cube), aggregations.date_span(sql_cube))
+    assert_same(aggregations.unit_values(pandas_cube), aggregations.unit_values(sql_cube))
+
+
+def test_stats_cards_and_daily_trend_match(cubes):
+    pandas_cube, sql_cube = cubes
+    for units in unit_selections(pandas_cube):
+        for start, end in windows(pandas_cube):
+            for chart, args in [
+                (aggregations.stats_totals, (units, start, end)),
+                (aggregations.daily_trend, (units, start, end)),
+                (aggregations.daily_trend, (units, start, end, 7)),
+            ]:
+                assert_same(chart(pandas_cube, *args), chart(sql_cube, *args))
+            if start is not None:
+                assert_same(
+                    aggregations.period_over_period(pandas_cube, units, start, end),
+                    aggregations.period_over_period(sql_cube, units, start, end),
+                )
+
+
+@pytest.mark.parametrize('mode', ['Amount', 'Volume'])
+def test_unit_charts_match(cubes, transactions, mode):
+    pandas_cube, sql_cube = cubes
+    for unit in aggregations.unit_values(pandas_cube):
+        categories = transactions.loc[transactions['Quantity unit'] == unit, 'category_group'].unique()
+        charts = [
+            (aggregations.top_suppliers, (unit,)),
+            (aggregations.top_suppliers, (unit, 15)),
+            (aggregations.category_split, (unit, mode)),
+            (aggregations.top_products, (unit,)),
+            *[(aggregations.top_products, (unit, str(category))) for category in categories],
+            *[
+                (aggregations.supplier_trend, (unit, mode, 4, freq, dense))
+                for freq in aggregations.TREND_FREQUENCIES.values()
+                for dense in (True, False)
+            ],
+        ]
+        for chart, args in charts:
+            assert_same(chart(pandas_cube, *args), chart(sql_cube, *args))